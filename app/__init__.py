@@ -38,6 +38,10 @@ def create_app():
     from .services.chat_store import init_db
     init_db()
 
+    # Archivado/compactación en segundo plano (opcional, CHAT_MAINTENANCE_INTERVAL_SECONDS)
+    from .services.chat_maintenance import start_background_maintenance
+    start_background_maintenance()
+
     # Blueprints
     from .routes.chat import chat_bp
     from .routes.brief import brief_bp
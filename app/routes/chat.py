@@ -4,9 +4,14 @@ from flask import Blueprint, jsonify, request
 from app.services.llm_client import LLMClient
 from app.services.chat_store import ensure_session, add_message, get_messages, reset_session
 from app.services.apolo_orchestrator import run_apolo
+from app.services.traffic_recorder import start_recording, finish_recording, timed_stage
 
 chat_bp = Blueprint("chat_bp", __name__)
 
+# Grabación de tráfico opcional (CHAT_RECORD_PATH); sin la variable no hace nada
+chat_bp.before_request(start_recording)
+chat_bp.after_request(finish_recording)
+
 
 @chat_bp.get("/")
 def chat_index():
@@ -36,12 +41,13 @@ def chat_stream():
         }), 400
 
     # Memoria: asegura sesión y agrega mensaje del usuario
-    ensure_session(session_id)
-    add_message(session_id, "user", message)
+    with timed_stage("store.history"):
+        ensure_session(session_id)
+        add_message(session_id, "user", message)
 
-    # Construir historial para LLM
-    max_ctx = int(os.getenv("MAX_CONTEXT_MESSAGES", "20"))
-    history = get_messages(session_id, limit=max_ctx)
+        # Construir historial para LLM
+        max_ctx = int(os.getenv("MAX_CONTEXT_MESSAGES", "20"))
+        history = get_messages(session_id, limit=max_ctx)
 
     system_prompt = os.getenv("SYSTEM_PROMPT", "Eres un asistente útil y conciso.")
     messages = [{"role": "system", "content": system_prompt}] + history
@@ -50,11 +56,13 @@ def chat_stream():
         provider = os.getenv("LLM_PROVIDER", "groq").lower()
 
         # Orquestador Apolo - respuesta directa
-        result = run_apolo(session_id=session_id, history=messages[1:], provider=provider)
+        with timed_stage("apolo"):
+            result = run_apolo(session_id=session_id, history=messages[1:], provider=provider)
         
         # Guardar respuesta completa del asistente
         message = result.get("message", "")
-        add_message(session_id, "assistant", message)
+        with timed_stage("store.reply"):
+            add_message(session_id, "assistant", message)
         
         # Respuesta JSON directa
         return jsonify({
@@ -4,6 +4,7 @@ from typing import Dict, List, Optional
 
 from app.services.llm_client import LLMClient
 from app.services.chat_store import get_apolo_state, set_apolo_state
+from app.services.traffic_recorder import timed_stage
 
 PROMPTS_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "llm", "prompts")
 
@@ -202,27 +203,34 @@ def run_apolo(session_id: str, history: List[Dict[str, str]], provider: str) ->
     Retorna dict con {"message": texto_final, "step": "asking"|"done", "summary": texto_o_null}
     """
     # Cargar estado y normalizar claves antiguas
-    state = get_apolo_state(session_id) or _default_state()
+    with timed_stage("store.state"):
+        state = get_apolo_state(session_id) or _default_state()
     state = _normalize_state_keys(state)
 
     # 1) extract
-    updates = _extract_updates(provider, history, state)
+    with timed_stage("llm.extract"):
+        updates = _extract_updates(provider, history, state)
     state = _merge_updates(state, updates)
-    set_apolo_state(session_id, state)
+    with timed_stage("store.state"):
+        set_apolo_state(session_id, state)
 
     missing = _missing_slots(state)
     is_first_response = not any(m.get("role") == "assistant" for m in history)
 
     if missing:
         # 2a) next → respuesta directa
-        message = _get_next(provider, history, state)
+        with timed_stage("llm.next"):
+            message = _get_next(provider, history, state)
         if is_first_response:
             intro = _first_intro_message()
             message = intro + "\n\n" + message
-        message = _guard_output(provider, message, step="asking")
+        with timed_stage("llm.guard"):
+            message = _guard_output(provider, message, step="asking")
         return {"message": message, "step": "asking", "summary": None}
     else:
         # 2b) final validator → resumen extendido y cierre
-        final_text = _get_final(provider, history, state)
-        final_text = _guard_output(provider, final_text, step="done")
+        with timed_stage("llm.final"):
+            final_text = _get_final(provider, history, state)
+        with timed_stage("llm.guard"):
+            final_text = _guard_output(provider, final_text, step="done")
         return {"message": final_text, "step": "done", "summary": final_text}
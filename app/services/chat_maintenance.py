@@ -0,0 +1,250 @@
+"""Mantenimiento de chat.sqlite3: archivado, compactación y métricas.
+
+Mueve a `archived_sessions` (un blob comprimido por sesión) las sesiones que
+llegaron a `step: done` o que llevan inactivas más del TTL, libera páginas con
+`incremental_vacuum` y hace checkpoint del WAL.
+
+Uso offline:
+    python -m app.services.chat_maintenance --ttl-hours 72 --report
+    python -m app.services.chat_maintenance --full-vacuum --checkpoint TRUNCATE
+"""
+import argparse
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+
+from app.services.chat_store import (
+    archive_session,
+    compact_storage,
+    get_messages,
+    init_db,
+    list_session_activity,
+    storage_stats,
+)
+from app.services.chat_store_base import ARCHIVE_CODECS, check_codec
+from app.services.apolo_orchestrator import _missing_slots, _normalize_state_keys
+
+logger = logging.getLogger(__name__)
+_MAINTENANCE_THREAD: Optional[threading.Thread] = None
+_MAINTENANCE_LOCK = threading.Lock()
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, str(default)))
+    except ValueError:
+        return default
+
+
+def _is_done(state: Optional[Dict]) -> bool:
+    """Misma definición de `step: done` que `run_apolo`: sin slots pendientes."""
+    if not state:
+        return False
+    return not _missing_slots(_normalize_state_keys(state))
+
+
+def find_archivable_sessions(
+    ttl_hours: float,
+    done_grace_minutes: float = 30,
+    now: Optional[datetime] = None,
+) -> List[Tuple[str, str, str]]:
+    """Retorna [(session_id, motivo, corte)] con motivo "done" o "idle".
+
+    - done: todos los slots completos y sin actividad durante `done_grace_minutes`.
+    - idle: sin actividad durante `ttl_hours` (<= 0 desactiva este criterio).
+
+    `corte` es el ISO UTC que `archive_session` vuelve a comprobar bajo lock.
+    """
+    now = now or datetime.now(timezone.utc)
+    idle_cutoff = (now - timedelta(hours=ttl_hours)).isoformat() if ttl_hours > 0 else None
+    done_cutoff = (now - timedelta(minutes=done_grace_minutes)).isoformat()
+
+    candidates: List[Tuple[str, str, str]] = []
+    for s in list_session_activity():
+        last = s["last_activity"] or ""
+        if _is_done(s["state"]) and last <= done_cutoff:
+            candidates.append((s["session_id"], "done", done_cutoff))
+        elif idle_cutoff is not None and last <= idle_cutoff:
+            candidates.append((s["session_id"], "idle", idle_cutoff))
+    return candidates
+
+
+def run_maintenance(
+    ttl_hours: Optional[float] = None,
+    done_grace_minutes: Optional[float] = None,
+    codec: Optional[str] = None,
+    batch_size: Optional[int] = None,
+    vacuum_pages: Optional[int] = None,
+    checkpoint: str = "PASSIVE",
+    full_vacuum: bool = False,
+) -> Dict:
+    """Archiva sesiones elegibles y compacta la base.
+
+    Los parámetros omitidos se toman de entorno/.env:
+      CHAT_SESSION_TTL_HOURS (72), CHAT_DONE_GRACE_MINUTES (30),
+      CHAT_ARCHIVE_CODEC (zlib), CHAT_MAINTENANCE_BATCH (200),
+      CHAT_VACUUM_PAGES (1000).
+    """
+    ttl_hours = _env_float("CHAT_SESSION_TTL_HOURS", 72) if ttl_hours is None else ttl_hours
+    done_grace_minutes = _env_float("CHAT_DONE_GRACE_MINUTES", 30) if done_grace_minutes is None else done_grace_minutes
+    # Falla antes de tocar sesiones si el codec no sirve (p.ej. zstd sin `zstandard`)
+    codec = check_codec(codec or os.getenv("CHAT_ARCHIVE_CODEC", "zlib"))
+    batch_size = int(_env_float("CHAT_MAINTENANCE_BATCH", 200)) if batch_size is None else batch_size
+    vacuum_pages = int(_env_float("CHAT_VACUUM_PAGES", 1000)) if vacuum_pages is None else vacuum_pages
+
+    started = time.perf_counter()
+    candidates = find_archivable_sessions(ttl_hours, done_grace_minutes)
+    if batch_size > 0:
+        candidates = candidates[:batch_size]
+
+    archived = {"done": 0, "idle": 0}
+    messages = raw_bytes = compressed_bytes = 0
+    skipped = 0
+    for session_id, reason, cutoff in candidates:
+        # Si la sesión tuvo actividad tras el escaneo, archive_session la descarta
+        info = archive_session(session_id, reason=reason, codec=codec, cutoff=cutoff)
+        if info is None:
+            skipped += 1
+            continue
+        archived[reason] += 1
+        messages += info["messages"]
+        raw_bytes += info["raw_bytes"]
+        compressed_bytes += info["compressed_bytes"]
+
+    compaction = compact_storage(vacuum_pages=vacuum_pages, checkpoint=checkpoint, full_vacuum=full_vacuum)
+
+    return {
+        "archived_done": archived["done"],
+        "archived_idle": archived["idle"],
+        "skipped_active": skipped,
+        "messages_archived": messages,
+        "raw_bytes": raw_bytes,
+        "compressed_bytes": compressed_bytes,
+        "compaction": compaction,
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 2),
+    }
+
+
+def sample_session_ids(sample: int = 50) -> List[str]:
+    """Primeras `sample` sesiones vivas, para medir latencia siempre sobre los mismos ids."""
+    return [s["session_id"] for s in list_session_activity()[: max(sample, 0)]]
+
+
+def measure_query_latency(session_ids: List[str], limit: Optional[int] = None) -> Dict[str, float]:
+    """Mide la latencia de `get_messages` sobre `session_ids` (ms).
+
+    `live` cuenta los ids que siguen con mensajes vivos; los archivados entre
+    dos mediciones se consultan igual (miss) para que ambas sean comparables.
+    """
+    if limit is None:
+        limit = int(os.getenv("MAX_CONTEXT_MESSAGES", "20"))
+    if not session_ids:
+        return {"samples": 0, "live": 0, "p50_ms": 0.0, "p95_ms": 0.0, "max_ms": 0.0}
+
+    timings: List[float] = []
+    live = 0
+    for session_id in session_ids:
+        t0 = time.perf_counter()
+        rows = get_messages(session_id, limit=limit)
+        timings.append((time.perf_counter() - t0) * 1000)
+        live += 1 if rows else 0
+    timings.sort()
+
+    def _pct(p: float) -> float:
+        return round(timings[min(int(p * len(timings)), len(timings) - 1)], 3)
+
+    return {
+        "samples": len(timings),
+        "live": live,
+        "p50_ms": _pct(0.50),
+        "p95_ms": _pct(0.95),
+        "max_ms": round(timings[-1], 3),
+    }
+
+
+def _maintenance_loop(interval_seconds: float) -> None:
+    while True:
+        time.sleep(interval_seconds)
+        try:
+            run_maintenance()
+        except Exception:
+            # Reintento en el próximo ciclo (p.ej. BD ocupada por otro proceso)
+            logger.exception("Falló el mantenimiento de chat; se reintenta en %.0f s", interval_seconds)
+
+
+def start_background_maintenance(interval_seconds: Optional[float] = None) -> bool:
+    """Lanza un hilo daemon que ejecuta `run_maintenance` cada N segundos.
+
+    N se toma de CHAT_MAINTENANCE_INTERVAL_SECONDS (0 = desactivado, por defecto).
+    Sólo se lanza un hilo por proceso. Retorna True si el hilo quedó activo;
+    con un CHAT_ARCHIVE_CODEC inválido registra el error y no lo lanza.
+    """
+    global _MAINTENANCE_THREAD
+    if interval_seconds is None:
+        interval_seconds = _env_float("CHAT_MAINTENANCE_INTERVAL_SECONDS", 0)
+    if interval_seconds <= 0:
+        return False
+    try:
+        check_codec(os.getenv("CHAT_ARCHIVE_CODEC", "zlib"))
+    except (ValueError, RuntimeError) as e:
+        logger.error("Mantenimiento de chat desactivado: %s", e)
+        return False
+    with _MAINTENANCE_LOCK:
+        if _MAINTENANCE_THREAD is None or not _MAINTENANCE_THREAD.is_alive():
+            _MAINTENANCE_THREAD = threading.Thread(
+                target=_maintenance_loop,
+                args=(interval_seconds,),
+                name="chat-maintenance",
+                daemon=True,
+            )
+            _MAINTENANCE_THREAD.start()
+    return True
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Archivado y compactación de chat.sqlite3")
+    parser.add_argument("--ttl-hours", type=float, default=None, help="Horas de inactividad para archivar (<= 0 desactiva)")
+    parser.add_argument("--done-grace-minutes", type=float, default=None, help="Espera tras step=done antes de archivar")
+    parser.add_argument("--codec", choices=list(ARCHIVE_CODECS), default=None)
+    parser.add_argument("--batch-size", type=int, default=0, help="Máximo de sesiones a archivar (0 = todas)")
+    parser.add_argument("--vacuum-pages", type=int, default=0, help="Páginas a liberar (0 = todas)")
+    parser.add_argument("--checkpoint", default="TRUNCATE", choices=["PASSIVE", "FULL", "RESTART", "TRUNCATE"])
+    parser.add_argument("--full-vacuum", action="store_true", help="VACUUM completo (activa auto_vacuum incremental)")
+    parser.add_argument("--report", action="store_true", help="Incluye tamaños y latencia antes/después")
+    parser.add_argument("--sample", type=int, default=50, help="Sesiones muestreadas para medir latencia")
+    args = parser.parse_args(argv)
+
+    init_db()
+    output: Dict = {}
+    if args.report:
+        # Misma muestra antes y después: el archivado saca sesiones de la lista viva
+        sample_ids = sample_session_ids(args.sample)
+        output["before"] = {"storage": storage_stats(), "latency": measure_query_latency(sample_ids)}
+
+    try:
+        output["maintenance"] = run_maintenance(
+            ttl_hours=args.ttl_hours,
+            done_grace_minutes=args.done_grace_minutes,
+            codec=args.codec,
+            batch_size=args.batch_size,
+            vacuum_pages=args.vacuum_pages,
+            checkpoint=args.checkpoint,
+            full_vacuum=args.full_vacuum,
+        )
+    except (ValueError, RuntimeError) as e:
+        # Codec inválido (CHAT_ARCHIVE_CODEC) o zstd sin `zstandard`
+        parser.error(str(e))
+
+    if args.report:
+        output["after"] = {"storage": storage_stats(), "latency": measure_query_latency(sample_ids)}
+
+    print(json.dumps(output, ensure_ascii=False, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,12 +1,18 @@
+"""Almacenamiento de chat: funciones de módulo sobre un backend configurable.
+
+Backend por `CHAT_STORE_BACKEND`:
+  - sqlite (por defecto): un único archivo `CHAT_DB_PATH`.
+  - sharded: `CHAT_STORE_SHARDS` archivos SQLite derivados de `CHAT_DB_PATH`,
+    enrutados por hash de `session_id`.
+  - memory: en memoria del proceso (pruebas).
+"""
 import os
-import sqlite3
+import threading
 from typing import List, Dict, Optional
-from datetime import datetime, timezone
-import json
 
-
-def _iso_now() -> str:
-    return datetime.now(timezone.utc).isoformat()
+from app.services.chat_store_base import ChatStore
+from app.services.chat_store_memory import MemoryChatStore
+from app.services.chat_store_sqlite import ShardedChatStore, SQLiteChatStore
 
 
 # Ruta por defecto del archivo SQLite: ./data/chat.sqlite3 (relativa al root del proyecto)
@@ -14,73 +20,59 @@ _ROOT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
 _DEFAULT_DB_PATH = os.path.join(_ROOT_DIR, "data", "chat.sqlite3")
 _DB_PATH = os.getenv("CHAT_DB_PATH", _DEFAULT_DB_PATH)
 
+STORE_BACKENDS = ("sqlite", "sharded", "memory")
+
+_STORE: Optional[ChatStore] = None
+_STORE_LOCK = threading.Lock()
+
+
+def create_store(backend: str, db_path: Optional[str] = None, shards: Optional[int] = None) -> ChatStore:
+    """Construye un backend sin registrarlo como el activo."""
+    backend = backend.lower().strip()
+    db_path = db_path or _DB_PATH
+    if backend == "sqlite":
+        return SQLiteChatStore(db_path)
+    if backend == "sharded":
+        shards = shards if shards is not None else int(os.getenv("CHAT_STORE_SHARDS", "4"))
+        return ShardedChatStore(db_path, shards)
+    if backend == "memory":
+        return MemoryChatStore()
+    raise ValueError(f"Backend de almacenamiento no soportado: {backend}")
 
-def _ensure_dir_exists(path: str) -> None:
-    os.makedirs(os.path.dirname(path), exist_ok=True)
 
+def get_store() -> ChatStore:
+    """Backend activo; se crea a partir del entorno en el primer uso."""
+    global _STORE
+    if _STORE is None:
+        with _STORE_LOCK:
+            if _STORE is None:
+                _STORE = create_store(os.getenv("CHAT_STORE_BACKEND", "sqlite"))
+    return _STORE
 
-def _connect() -> sqlite3.Connection:
-    conn = sqlite3.connect(_DB_PATH, check_same_thread=False)
-    conn.row_factory = sqlite3.Row
-    return conn
+
+def set_store(store: Optional[ChatStore]) -> None:
+    """Reemplaza el backend activo (None vuelve a leerlo del entorno)."""
+    global _STORE
+    with _STORE_LOCK:
+        _STORE = store
 
 
 def init_db() -> None:
     """Inicializa el archivo de base de datos y tablas si no existen."""
-    _ensure_dir_exists(_DB_PATH)
-    with _connect() as conn:
-        cur = conn.cursor()
-        cur.executescript(
-            """
-            PRAGMA journal_mode=WAL;
-
-            CREATE TABLE IF NOT EXISTS sessions (
-                session_id TEXT PRIMARY KEY,
-                created_at TEXT NOT NULL
-            );
-
-            CREATE TABLE IF NOT EXISTS messages (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                session_id TEXT NOT NULL,
-                role TEXT NOT NULL,
-                content TEXT NOT NULL,
-                created_at TEXT NOT NULL,
-                FOREIGN KEY (session_id) REFERENCES sessions(session_id)
-            );
-
-            CREATE TABLE IF NOT EXISTS apolo_state (
-                session_id TEXT PRIMARY KEY,
-                state_json TEXT NOT NULL,
-                updated_at TEXT NOT NULL
-            );
-            """
-        )
-        conn.commit()
+    get_store().init_db()
 
 
 def ensure_session(session_id: str) -> Dict[str, str]:
-    """Crea la sesión si no existe y retorna sus datos."""
-    with _connect() as conn:
-        cur = conn.cursor()
-        cur.execute(
-            "INSERT OR IGNORE INTO sessions (session_id, created_at) VALUES (?, ?)",
-            (session_id, _iso_now()),
-        )
-        conn.commit()
-        cur.execute("SELECT session_id, created_at FROM sessions WHERE session_id = ?", (session_id,))
-        row = cur.fetchone()
-        return {"session_id": row["session_id"], "created_at": row["created_at"]}
+    """Crea la sesión si no existe y retorna sus datos.
+
+    Si la sesión había sido archivada, se restaura antes de retornarla.
+    """
+    return get_store().ensure_session(session_id)
 
 
 def add_message(session_id: str, role: str, content: str) -> None:
     """Agrega un mensaje al historial de una sesión."""
-    with _connect() as conn:
-        cur = conn.cursor()
-        cur.execute(
-            "INSERT INTO messages (session_id, role, content, created_at) VALUES (?, ?, ?, ?)",
-            (session_id, role, content, _iso_now()),
-        )
-        conn.commit()
+    get_store().add_message(session_id, role, content)
 
 
 def get_messages(session_id: str, limit: Optional[int] = None) -> List[Dict[str, str]]:
@@ -88,55 +80,19 @@ def get_messages(session_id: str, limit: Optional[int] = None) -> List[Dict[str,
 
     Si se especifica `limit`, retorna los últimos N mensajes en orden cronológico.
     """
-    with _connect() as conn:
-        cur = conn.cursor()
-        if limit is None:
-            cur.execute(
-                "SELECT role, content FROM messages WHERE session_id = ? ORDER BY id ASC",
-                (session_id,),
-            )
-            rows = cur.fetchall()
-        else:
-            # Obtenemos últimos N (desc) y luego invertimos para orden ascendente
-            cur.execute(
-                "SELECT role, content FROM messages WHERE session_id = ? ORDER BY id DESC LIMIT ?",
-                (session_id, limit),
-            )
-            rows = list(reversed(cur.fetchall()))
-
-    return [{"role": r["role"], "content": r["content"]} for r in rows]
+    return get_store().get_messages(session_id, limit=limit)
 
 
 def get_apolo_state(session_id: str) -> Optional[Dict]:
-    with _connect() as conn:
-        cur = conn.cursor()
-        cur.execute("SELECT state_json FROM apolo_state WHERE session_id = ?", (session_id,))
-        row = cur.fetchone()
-        if not row:
-            return None
-        try:
-            return json.loads(row["state_json"])  # type: ignore
-        except Exception:
-            return None
+    return get_store().get_apolo_state(session_id)
 
 
 def set_apolo_state(session_id: str, state: Dict) -> None:
-    payload = json.dumps(state, ensure_ascii=False)
-    with _connect() as conn:
-        cur = conn.cursor()
-        cur.execute(
-            "INSERT INTO apolo_state (session_id, state_json, updated_at) VALUES (?, ?, ?)\n             ON CONFLICT(session_id) DO UPDATE SET state_json=excluded.state_json, updated_at=excluded.updated_at",
-            (session_id, payload, _iso_now()),
-        )
-        conn.commit()
+    get_store().set_apolo_state(session_id, state)
 
 
 def delete_apolo_state(session_id: str) -> int:
-    with _connect() as conn:
-        cur = conn.cursor()
-        cur.execute("DELETE FROM apolo_state WHERE session_id = ?", (session_id,))
-        conn.commit()
-        return cur.rowcount
+    return get_store().delete_apolo_state(session_id)
 
 
 def reset_session(session_id: str) -> Dict[str, int | bool]:
@@ -147,16 +103,59 @@ def reset_session(session_id: str) -> Dict[str, int | bool]:
       - messages_deleted: int (cuántos mensajes se borraron)
       - session_deleted: int (1 si se eliminó la fila de sesión, 0 en caso contrario)
     """
-    with _connect() as conn:
-        cur = conn.cursor()
-        cur.execute("SELECT COUNT(*) AS cnt FROM messages WHERE session_id = ?", (session_id,))
-        msg_count = int(cur.fetchone()["cnt"])
-
-        cur.execute("DELETE FROM messages WHERE session_id = ?", (session_id,))
-        cur.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
-        session_deleted = cur.rowcount
-        cur.execute("DELETE FROM apolo_state WHERE session_id = ?", (session_id,))
-        apolo_deleted = cur.rowcount
-        conn.commit()
-
-    return {"had_conversation": msg_count > 0, "messages_deleted": msg_count, "session_deleted": session_deleted}
\ No newline at end of file
+    return get_store().reset_session(session_id)
+
+
+# --- Archivado y compactación ---------------------------------------------
+
+
+def list_session_activity() -> List[Dict]:
+    """Lista las sesiones vivas con su última actividad y estado Apolo.
+
+    `last_activity` es el máximo ISO entre creación de sesión, último
+    `ensure_session` (inicio de cada request), último mensaje y última
+    actualización de estado (todas en UTC, comparables como texto).
+    """
+    return get_store().list_session_activity()
+
+
+def archive_session(
+    session_id: str, reason: str, codec: str = "zlib", cutoff: Optional[str] = None
+) -> Optional[Dict[str, int]]:
+    """Mueve una sesión viva al archivo como un único blob comprimido.
+
+    El blob contiene sesión, mensajes y estado Apolo en JSON. Las filas vivas
+    se eliminan en la misma transacción. Retorna None si la sesión no existe
+    o si, con `cutoff` (ISO UTC), su última actividad es posterior al corte:
+    la actividad se recalcula dentro de la transacción.
+    """
+    return get_store().archive_session(session_id, reason=reason, codec=codec, cutoff=cutoff)
+
+
+def get_archived_session(session_id: str) -> Optional[Dict]:
+    """Retorna el documento descomprimido de una sesión archivada (o None)."""
+    return get_store().get_archived_session(session_id)
+
+
+def restore_archived_session(session_id: str) -> bool:
+    """Devuelve una sesión archivada a las tablas vivas y borra su archivo.
+
+    Retorna True si había archivo para esa sesión.
+    """
+    return get_store().restore_archived_session(session_id)
+
+
+def storage_stats() -> Dict[str, int]:
+    """Tamaños en disco (archivo principal y WAL) y conteos de páginas/filas."""
+    return get_store().storage_stats()
+
+
+def compact_storage(vacuum_pages: int = 1000, checkpoint: str = "PASSIVE", full_vacuum: bool = False) -> Dict[str, int]:
+    """Libera páginas y hace checkpoint del WAL.
+
+    - Con `auto_vacuum=INCREMENTAL` libera hasta `vacuum_pages` páginas (0 = todas).
+    - `full_vacuum=True` ejecuta VACUUM completo (bloquea la BD; sólo offline) y
+      de paso activa el modo incremental en bases creadas antes de este cambio.
+    - `checkpoint`: PASSIVE (no bloquea escritores), FULL, RESTART o TRUNCATE.
+    """
+    return get_store().compact_storage(vacuum_pages=vacuum_pages, checkpoint=checkpoint, full_vacuum=full_vacuum)
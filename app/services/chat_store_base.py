@@ -0,0 +1,187 @@
+"""Interfaz común de almacenamiento de chat y utilidades compartidas por los backends."""
+import json
+import zlib
+from abc import ABC, abstractmethod
+from datetime import datetime, timezone
+from typing import Callable, Dict, Iterator, List, Optional
+
+try:
+    import zstandard
+except Exception:  # pragma: no cover
+    zstandard = None
+
+
+ARCHIVE_CODECS = ("zlib", "zstd")
+
+
+def iso_now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def check_codec(codec: str) -> str:
+    """Valida un codec de archivo antes de usarlo; retorna el mismo codec."""
+    if codec not in ARCHIVE_CODECS:
+        raise ValueError(f"Codec no soportado: {codec} (opciones: {', '.join(ARCHIVE_CODECS)})")
+    if codec == "zstd" and zstandard is None:
+        raise RuntimeError("Paquete 'zstandard' no disponible. Añádelo a requirements o usa codec 'zlib'.")
+    return codec
+
+
+def compress_payload(data: bytes, codec: str) -> bytes:
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("Paquete 'zstandard' no disponible. Añádelo a requirements o usa codec 'zlib'.")
+        return zstandard.ZstdCompressor(level=10).compress(data)
+    if codec == "zlib":
+        return zlib.compress(data, 9)
+    raise ValueError(f"Codec no soportado: {codec}")
+
+
+def decompress_payload(data: bytes, codec: str) -> bytes:
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("Paquete 'zstandard' no disponible para leer el archivo de la sesión.")
+        return zstandard.ZstdDecompressor().decompress(data)
+    if codec == "zlib":
+        return zlib.decompress(data)
+    raise ValueError(f"Codec no soportado: {codec}")
+
+
+def build_archive_record(document: Dict, reason: str, codec: str) -> Dict:
+    """Comprime un documento de sesión (ver `export_session`) en un registro de archivo."""
+    raw = json.dumps(document, ensure_ascii=False).encode("utf-8")
+    return {
+        "session_id": document["session_id"],
+        "reason": reason,
+        "codec": codec,
+        "payload": compress_payload(raw, codec),
+        "message_count": len(document["messages"]),
+        "raw_bytes": len(raw),
+        "archived_at": iso_now(),
+    }
+
+
+def load_archive_record(record: Dict) -> Dict:
+    """Descomprime un registro de archivo y retorna el documento de sesión."""
+    document = json.loads(decompress_payload(record["payload"], record["codec"]).decode("utf-8"))
+    document["reason"] = record["reason"]
+    document["archived_at"] = record["archived_at"]
+    return document
+
+
+def parse_state(state_json: Optional[str]) -> Optional[Dict]:
+    if not state_json:
+        return None
+    try:
+        return json.loads(state_json)
+    except Exception:
+        return None
+
+
+class ChatStore(ABC):
+    """Contrato de un backend de almacenamiento de chat.
+
+    Un documento de sesión (usado en archivado y migración) tiene la forma:
+        {"session_id", "created_at", "messages": [{"role", "content", "created_at"}],
+         "apolo_state": str JSON | None, "apolo_state_updated_at": str | None}
+
+    Los backends deben implementar todos los métodos abstractos; si falta
+    alguno, instanciarlos falla con TypeError.
+    """
+
+    @abstractmethod
+    def init_db(self) -> None:
+        ...
+
+    @abstractmethod
+    def ensure_session(self, session_id: str) -> Dict[str, str]:
+        ...
+
+    @abstractmethod
+    def add_message(self, session_id: str, role: str, content: str) -> None:
+        ...
+
+    @abstractmethod
+    def get_messages(self, session_id: str, limit: Optional[int] = None) -> List[Dict[str, str]]:
+        ...
+
+    @abstractmethod
+    def get_apolo_state(self, session_id: str) -> Optional[Dict]:
+        ...
+
+    @abstractmethod
+    def set_apolo_state(self, session_id: str, state: Dict) -> None:
+        ...
+
+    @abstractmethod
+    def delete_apolo_state(self, session_id: str) -> int:
+        ...
+
+    @abstractmethod
+    def reset_session(self, session_id: str) -> Dict[str, int | bool]:
+        ...
+
+    # --- Archivado y compactación ---
+
+    @abstractmethod
+    def list_session_activity(self) -> List[Dict]:
+        ...
+
+    @abstractmethod
+    def archive_session(
+        self, session_id: str, reason: str, codec: str = "zlib", cutoff: Optional[str] = None
+    ) -> Optional[Dict[str, int]]:
+        ...
+
+    @abstractmethod
+    def get_archived_session(self, session_id: str) -> Optional[Dict]:
+        ...
+
+    @abstractmethod
+    def restore_archived_session(self, session_id: str) -> bool:
+        ...
+
+    @abstractmethod
+    def storage_stats(self) -> Dict[str, int]:
+        ...
+
+    @abstractmethod
+    def compact_storage(self, vacuum_pages: int = 1000, checkpoint: str = "PASSIVE", full_vacuum: bool = False) -> Dict[str, int]:
+        ...
+
+    # --- Migración entre backends ---
+
+    @abstractmethod
+    def iter_session_ids(self) -> Iterator[str]:
+        ...
+
+    @abstractmethod
+    def export_session(self, session_id: str) -> Optional[Dict]:
+        ...
+
+    @abstractmethod
+    def import_session(self, document: Dict) -> None:
+        """Escribe un documento de sesión reemplazando lo que hubiera para ese id."""
+        ...
+
+    @abstractmethod
+    def iter_archived_records(self) -> Iterator[Dict]:
+        ...
+
+    @abstractmethod
+    def import_archived_record(self, record: Dict) -> None:
+        ...
+
+    @abstractmethod
+    def move_session(self, session_id: str, sink: Callable[[Dict], None]) -> Optional[Dict]:
+        """Exporta la sesión, la entrega a `sink` y la borra, todo bajo el lock de escritura.
+
+        Si `sink` falla la sesión queda intacta en este backend. Retorna el
+        documento movido, o None si la sesión ya no existe.
+        """
+        ...
+
+    @abstractmethod
+    def move_archived_record(self, session_id: str, sink: Callable[[Dict], None]) -> Optional[Dict]:
+        """Como `move_session`, para un registro de `archived_sessions`."""
+        ...
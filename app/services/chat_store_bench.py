@@ -0,0 +1,134 @@
+"""Benchmark de throughput de escritura con muchos escritores concurrentes.
+
+Cada escritor (proceso, como en Passenger; o hilo) crea sus propias sesiones y
+repite el patrón de `/chat/stream`: ensure_session + add_message(user) +
+set_apolo_state + add_message(assistant).
+
+Ejemplo:
+    python -m app.services.chat_store_bench --backend sqlite --writers 16
+    python -m app.services.chat_store_bench --backend sharded --shards 8 --writers 16
+"""
+import argparse
+import json
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+from app.services.chat_store import create_store
+from app.services.chat_store_base import ChatStore
+
+_MESSAGE = "Quiero una app de reservas para clínicas veterinarias en Lima. " * 4
+
+
+def _run_writer(store: ChatStore, writer: int, sessions: int, turns: int) -> Dict:
+    latencies: List[float] = []
+    errors = 0
+    started = time.time()
+    for s in range(sessions):
+        session_id = f"bench-{os.getpid()}-{writer}-{s}"
+        store.ensure_session(session_id)
+        for t in range(turns):
+            for op in (
+                lambda: store.add_message(session_id, "user", _MESSAGE),
+                lambda: store.set_apolo_state(session_id, {"idea_negocio": _MESSAGE, "turn": t}),
+                lambda: store.add_message(session_id, "assistant", _MESSAGE),
+            ):
+                t0 = time.perf_counter()
+                try:
+                    op()
+                except Exception:
+                    errors += 1
+                    continue
+                latencies.append((time.perf_counter() - t0) * 1000)
+    return {"started": started, "finished": time.time(), "latencies": latencies, "errors": errors}
+
+
+def _process_writer(backend: str, db_path: str, shards: int, writer: int, sessions: int, turns: int) -> Dict:
+    store = create_store(backend, db_path=db_path, shards=shards)
+    return _run_writer(store, writer, sessions, turns)
+
+
+def run_benchmark(
+    backend: str,
+    writers: int = 16,
+    sessions: int = 5,
+    turns: int = 10,
+    shards: int = 8,
+    db_path: Optional[str] = None,
+    mode: str = "process",
+) -> Dict:
+    """Ejecuta el benchmark y retorna throughput, latencias (ms) y errores."""
+    workdir = None
+    if db_path is None and backend != "memory":
+        workdir = tempfile.mkdtemp(prefix="chat-bench-")
+        db_path = os.path.join(workdir, "chat.sqlite3")
+    try:
+        store = create_store(backend, db_path=db_path, shards=shards)
+        store.init_db()
+
+        if backend == "memory" or mode == "thread":
+            # El backend en memoria no se comparte entre procesos
+            with ThreadPoolExecutor(max_workers=writers) as pool:
+                futures = [pool.submit(_run_writer, store, w, sessions, turns) for w in range(writers)]
+                results = [f.result() for f in futures]
+        else:
+            with ProcessPoolExecutor(max_workers=writers) as pool:
+                futures = [
+                    pool.submit(_process_writer, backend, db_path, shards, w, sessions, turns) for w in range(writers)
+                ]
+                results = [f.result() for f in futures]
+    finally:
+        # Sólo borramos el directorio temporal propio; --db-path se conserva
+        if workdir is not None:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    latencies = sorted(l for r in results for l in r["latencies"])
+    errors = sum(r["errors"] for r in results)
+    elapsed = max(r["finished"] for r in results) - min(r["started"] for r in results)
+
+    def _pct(p: float) -> float:
+        if not latencies:
+            return 0.0
+        return round(latencies[min(int(p * len(latencies)), len(latencies) - 1)], 3)
+
+    return {
+        "backend": backend,
+        "shards": shards if backend == "sharded" else None,
+        "mode": "thread" if backend == "memory" else mode,
+        "writers": writers,
+        "writes": len(latencies),
+        "errors": errors,
+        "elapsed_s": round(elapsed, 3),
+        "writes_per_s": round(len(latencies) / elapsed, 1) if elapsed > 0 else 0.0,
+        "p50_ms": _pct(0.50),
+        "p95_ms": _pct(0.95),
+        "p99_ms": _pct(0.99),
+        "db_path": db_path if workdir is None else None,
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark de escritura concurrente de chat_store")
+    parser.add_argument("--backend", action="append", choices=["sqlite", "sharded", "memory"],
+                        help="Repetible; por defecto sqlite y sharded")
+    parser.add_argument("--writers", type=int, default=16)
+    parser.add_argument("--sessions", type=int, default=5, help="Sesiones por escritor")
+    parser.add_argument("--turns", type=int, default=10, help="Turnos por sesión (3 escrituras cada uno)")
+    parser.add_argument("--shards", type=int, default=8)
+    parser.add_argument("--db-path", default=None, help="Ruta base (por defecto un directorio temporal)")
+    parser.add_argument("--mode", choices=["process", "thread"], default="process")
+    args = parser.parse_args(argv)
+
+    results = [
+        run_benchmark(b, args.writers, args.sessions, args.turns, args.shards, args.db_path, args.mode)
+        for b in (args.backend or ["sqlite", "sharded"])
+    ]
+    print(json.dumps(results, ensure_ascii=False, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
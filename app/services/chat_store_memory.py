@@ -0,0 +1,226 @@
+"""Backend en memoria (por proceso) para pruebas y benchmarks."""
+import copy
+import json
+import threading
+from typing import Callable, Dict, Iterator, List, Optional
+
+from app.services.chat_store_base import (
+    ChatStore,
+    build_archive_record,
+    iso_now,
+    load_archive_record,
+    parse_state,
+)
+
+
+class MemoryChatStore(ChatStore):
+    """Guarda sesiones en diccionarios protegidos por un lock. No persiste nada."""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._sessions: Dict[str, str] = {}
+        self._last_seen: Dict[str, str] = {}
+        self._messages: Dict[str, List[Dict[str, str]]] = {}
+        self._states: Dict[str, Dict[str, str]] = {}
+        self._archived: Dict[str, Dict] = {}
+
+    def init_db(self) -> None:
+        return None
+
+    def ensure_session(self, session_id: str) -> Dict[str, str]:
+        with self._lock:
+            if session_id not in self._sessions:
+                if not self.restore_archived_session(session_id):
+                    self._sessions[session_id] = iso_now()
+            # Marca el request en curso: `archive_session(cutoff=...)` ya no la archiva
+            self._last_seen[session_id] = iso_now()
+            return {"session_id": session_id, "created_at": self._sessions[session_id]}
+
+    def add_message(self, session_id: str, role: str, content: str) -> None:
+        with self._lock:
+            self._messages.setdefault(session_id, []).append(
+                {"role": role, "content": content, "created_at": iso_now()}
+            )
+
+    def get_messages(self, session_id: str, limit: Optional[int] = None) -> List[Dict[str, str]]:
+        with self._lock:
+            rows = self._messages.get(session_id, [])
+            if limit is not None:
+                rows = rows[-limit:] if limit > 0 else []
+            return [{"role": m["role"], "content": m["content"]} for m in rows]
+
+    def get_apolo_state(self, session_id: str) -> Optional[Dict]:
+        with self._lock:
+            row = self._states.get(session_id)
+        return parse_state(row["state_json"]) if row else None
+
+    def set_apolo_state(self, session_id: str, state: Dict) -> None:
+        payload = json.dumps(state, ensure_ascii=False)
+        with self._lock:
+            self._states[session_id] = {"state_json": payload, "updated_at": iso_now()}
+
+    def delete_apolo_state(self, session_id: str) -> int:
+        with self._lock:
+            return 1 if self._states.pop(session_id, None) is not None else 0
+
+    def reset_session(self, session_id: str) -> Dict[str, int | bool]:
+        with self._lock:
+            msg_count = len(self._messages.pop(session_id, []))
+            session_deleted = 1 if self._sessions.pop(session_id, None) is not None else 0
+            self._last_seen.pop(session_id, None)
+            self._states.pop(session_id, None)
+            archived = self._archived.pop(session_id, None)
+            if archived:
+                msg_count += archived["message_count"]
+        return {"had_conversation": msg_count > 0, "messages_deleted": msg_count, "session_deleted": session_deleted}
+
+    # --- Archivado y compactación ---
+
+    def _last_activity(self, session_id: str) -> Optional[str]:
+        created_at = self._sessions.get(session_id)
+        if created_at is None:
+            return None
+        messages = self._messages.get(session_id) or []
+        state = self._states.get(session_id)
+        return max(
+            created_at,
+            self._last_seen.get(session_id, ""),
+            messages[-1]["created_at"] if messages else "",
+            state["updated_at"] if state else "",
+        )
+
+    def list_session_activity(self) -> List[Dict]:
+        with self._lock:
+            result: List[Dict] = []
+            for session_id in self._sessions:
+                state = self._states.get(session_id)
+                result.append({
+                    "session_id": session_id,
+                    "last_activity": self._last_activity(session_id),
+                    "state": parse_state(state["state_json"]) if state else None,
+                })
+            return result
+
+    def archive_session(
+        self, session_id: str, reason: str, codec: str = "zlib", cutoff: Optional[str] = None
+    ) -> Optional[Dict[str, int]]:
+        with self._lock:
+            last_activity = self._last_activity(session_id)
+            if last_activity is None or (cutoff is not None and last_activity > cutoff):
+                return None
+            document = self.export_session(session_id)
+            record = build_archive_record(document, reason, codec)
+            self._archived[session_id] = record
+            self._sessions.pop(session_id, None)
+            self._last_seen.pop(session_id, None)
+            self._messages.pop(session_id, None)
+            self._states.pop(session_id, None)
+        return {
+            "messages": record["message_count"],
+            "raw_bytes": record["raw_bytes"],
+            "compressed_bytes": len(record["payload"]),
+        }
+
+    def get_archived_session(self, session_id: str) -> Optional[Dict]:
+        with self._lock:
+            record = self._archived.get(session_id)
+        return load_archive_record(record) if record else None
+
+    def restore_archived_session(self, session_id: str) -> bool:
+        with self._lock:
+            record = self._archived.pop(session_id, None)
+            if record is None:
+                return False
+            document = load_archive_record(record)
+            # Igual que en SQLite: lo escrito mientras estaba archivada va después
+            # del historial archivado y el estado más reciente gana.
+            newer = self._messages.get(session_id, [])
+            state = self._states.get(session_id)
+            self.import_session(document)
+            self._messages[session_id].extend(newer)
+            if state is not None and (
+                session_id not in self._states or state["updated_at"] > self._states[session_id]["updated_at"]
+            ):
+                self._states[session_id] = state
+        return True
+
+    def storage_stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "db_bytes": 0,
+                "wal_bytes": 0,
+                "page_size": 0,
+                "page_count": 0,
+                "freelist_pages": 0,
+                "live_sessions": len(self._sessions),
+                "live_messages": sum(len(m) for m in self._messages.values()),
+                "archived_sessions": len(self._archived),
+            }
+
+    def compact_storage(self, vacuum_pages: int = 1000, checkpoint: str = "PASSIVE", full_vacuum: bool = False) -> Dict[str, int]:
+        return {"pages_released": 0, "wal_busy": 0, "wal_pages": 0, "wal_checkpointed": 0}
+
+    # --- Migración entre backends ---
+
+    def iter_session_ids(self) -> Iterator[str]:
+        with self._lock:
+            ids = sorted(self._sessions)
+        return iter(ids)
+
+    def export_session(self, session_id: str) -> Optional[Dict]:
+        with self._lock:
+            if session_id not in self._sessions:
+                return None
+            state = self._states.get(session_id)
+            return {
+                "session_id": session_id,
+                "created_at": self._sessions[session_id],
+                "messages": copy.deepcopy(self._messages.get(session_id, [])),
+                "apolo_state": state["state_json"] if state else None,
+                "apolo_state_updated_at": state["updated_at"] if state else None,
+            }
+
+    def import_session(self, document: Dict) -> None:
+        session_id = document["session_id"]
+        with self._lock:
+            self._sessions[session_id] = document["created_at"]
+            self._messages[session_id] = [
+                {"role": m["role"], "content": m["content"], "created_at": m["created_at"]}
+                for m in document["messages"]
+            ]
+            self._states.pop(session_id, None)
+            if document.get("apolo_state") is not None:
+                self._states[session_id] = {
+                    "state_json": document["apolo_state"],
+                    "updated_at": document["apolo_state_updated_at"],
+                }
+
+    def iter_archived_records(self) -> Iterator[Dict]:
+        with self._lock:
+            records = [dict(r) for r in self._archived.values()]
+        return iter(records)
+
+    def import_archived_record(self, record: Dict) -> None:
+        with self._lock:
+            self._archived[record["session_id"]] = dict(record)
+
+    def move_session(self, session_id: str, sink: Callable[[Dict], None]) -> Optional[Dict]:
+        with self._lock:
+            document = self.export_session(session_id)
+            if document is None:
+                return None
+            sink(document)
+            self._sessions.pop(session_id, None)
+            self._last_seen.pop(session_id, None)
+            self._messages.pop(session_id, None)
+            self._states.pop(session_id, None)
+        return document
+
+    def move_archived_record(self, session_id: str, sink: Callable[[Dict], None]) -> Optional[Dict]:
+        with self._lock:
+            record = self._archived.get(session_id)
+            if record is None:
+                return None
+            sink(dict(record))
+            del self._archived[session_id]
+        return dict(record)
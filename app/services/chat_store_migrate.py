@@ -0,0 +1,92 @@
+"""Migración de sesiones entre backends de almacenamiento.
+
+Copia cada sesión viva (sesión, mensajes y estado Apolo) y cada sesión archivada
+desde el backend origen al destino; el destino decide el shard de cada una.
+
+Con `--delete-source` cada sesión se mueve: exportación, escritura en destino y
+borrado en origen ocurren bajo el lock de escritura del origen, así que nada
+escrito mientras tanto se pierde. Sólo se borran las sesiones movidas; las
+creadas durante la migración quedan en el origen. Los procesos que sigan
+configurados con el backend origen recrearán ahí las sesiones que reciban: cambia
+`CHAT_STORE_BACKEND` antes (o detén los escritores) y vuelve a ejecutar la
+migración para recoger lo que quede.
+
+Ejemplos:
+    # Archivo único → 8 shards
+    python -m app.services.chat_store_migrate --from sqlite --to sharded --to-shards 8
+    # Re-sharding 4 → 16 (los nombres incluyen N, no se pisan)
+    python -m app.services.chat_store_migrate --from sharded --from-shards 4 --to sharded --to-shards 16
+"""
+import argparse
+import json
+import time
+from typing import Dict, List, Optional
+
+from app.services.chat_store import STORE_BACKENDS, create_store
+from app.services.chat_store_base import ChatStore
+
+
+def migrate(source: ChatStore, target: ChatStore, delete_source: bool = False) -> Dict[str, float]:
+    """Redistribuye todas las sesiones de `source` en `target`.
+
+    Es idempotente: reimportar una sesión reemplaza su contenido en el destino.
+    """
+    started = time.perf_counter()
+    target.init_db()
+
+    sessions = messages = archived = 0
+    for session_id in list(source.iter_session_ids()):
+        if delete_source:
+            document = source.move_session(session_id, target.import_session)
+        else:
+            document = source.export_session(session_id)
+            if document is not None:
+                target.import_session(document)
+        if document is None:
+            continue
+        sessions += 1
+        messages += len(document["messages"])
+
+    for record in source.iter_archived_records():
+        if delete_source:
+            if source.move_archived_record(record["session_id"], target.import_archived_record) is None:
+                continue
+        else:
+            target.import_archived_record(record)
+        archived += 1
+
+    return {
+        "sessions": sessions,
+        "messages": messages,
+        "archived_sessions": archived,
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 2),
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Migra sesiones de chat entre backends de almacenamiento")
+    parser.add_argument("--from", dest="source", required=True, choices=[b for b in STORE_BACKENDS if b != "memory"])
+    parser.add_argument("--from-path", default=None, help="Ruta base origen (por defecto CHAT_DB_PATH)")
+    parser.add_argument("--from-shards", type=int, default=None)
+    parser.add_argument("--to", dest="target", required=True, choices=[b for b in STORE_BACKENDS if b != "memory"])
+    parser.add_argument("--to-path", default=None, help="Ruta base destino (por defecto CHAT_DB_PATH)")
+    parser.add_argument("--to-shards", type=int, default=None)
+    parser.add_argument("--delete-source", action="store_true", help="Mueve en vez de copiar (ver docstring del módulo)")
+    args = parser.parse_args(argv)
+
+    source = create_store(args.source, db_path=args.from_path, shards=args.from_shards)
+    target = create_store(args.target, db_path=args.to_path, shards=args.to_shards)
+    source.init_db()
+
+    source_files = getattr(source, "db_path", None) or [s.db_path for s in getattr(source, "shards", [])]
+    target_files = getattr(target, "db_path", None) or [s.db_path for s in getattr(target, "shards", [])]
+    if source_files == target_files:
+        parser.error("Origen y destino apuntan a los mismos archivos")
+
+    result = migrate(source, target, delete_source=args.delete_source)
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,567 @@
+"""Backends SQLite: un único archivo o N shards enrutados por hash de `session_id`."""
+import json
+import os
+import sqlite3
+import zlib
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional
+
+from app.services.chat_store_base import (
+    ChatStore,
+    build_archive_record,
+    iso_now,
+    load_archive_record,
+    parse_state,
+)
+
+
+_SCHEMA = """
+PRAGMA auto_vacuum=INCREMENTAL;
+PRAGMA journal_mode=WAL;
+
+CREATE TABLE IF NOT EXISTS sessions (
+    session_id TEXT PRIMARY KEY,
+    created_at TEXT NOT NULL,
+    last_seen TEXT
+);
+
+CREATE TABLE IF NOT EXISTS messages (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    session_id TEXT NOT NULL,
+    role TEXT NOT NULL,
+    content TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    FOREIGN KEY (session_id) REFERENCES sessions(session_id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_messages_session ON messages(session_id, id);
+
+CREATE TABLE IF NOT EXISTS apolo_state (
+    session_id TEXT PRIMARY KEY,
+    state_json TEXT NOT NULL,
+    updated_at TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS archived_sessions (
+    session_id TEXT PRIMARY KEY,
+    reason TEXT NOT NULL,
+    codec TEXT NOT NULL,
+    payload BLOB NOT NULL,
+    message_count INTEGER NOT NULL,
+    raw_bytes INTEGER NOT NULL,
+    archived_at TEXT NOT NULL
+);
+"""
+
+_ARCHIVE_COLUMNS = "session_id, reason, codec, payload, message_count, raw_bytes, archived_at"
+
+
+def _ensure_dir_exists(path: str) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+
+class SQLiteChatStore(ChatStore):
+    """Backend de un único archivo SQLite (comportamiento histórico)."""
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        """Conexión de corta vida: commit/rollback al salir y cierre explícito.
+
+        El `with` nativo de sqlite3 no cierra la conexión; si un proceso la
+        hereda por fork (Passenger, ProcessPoolExecutor) y la cierra, libera los
+        locks POSIX del padre sobre el archivo y puede corromper la base.
+        """
+        conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def init_db(self) -> None:
+        """Inicializa el archivo de base de datos y tablas si no existen."""
+        _ensure_dir_exists(self.db_path)
+        with self._connect() as conn:
+            cur = conn.cursor()
+            cur.executescript(_SCHEMA)
+            # Bases creadas antes de `last_seen`
+            columns = {r["name"] for r in cur.execute("PRAGMA table_info(sessions)")}
+            if "last_seen" not in columns:
+                cur.execute("ALTER TABLE sessions ADD COLUMN last_seen TEXT")
+            conn.commit()
+
+    def ensure_session(self, session_id: str) -> Dict[str, str]:
+        with self._connect() as conn:
+            cur = conn.cursor()
+            now = iso_now()
+            cur.execute(
+                "INSERT OR IGNORE INTO sessions (session_id, created_at, last_seen) VALUES (?, ?, ?)",
+                (session_id, now, now),
+            )
+            created = cur.rowcount == 1
+            if not created:
+                # Marca el request en curso: `archive_session(cutoff=...)` ya no la archiva
+                cur.execute("UPDATE sessions SET last_seen = ? WHERE session_id = ?", (now, session_id))
+            conn.commit()
+            if created:
+                self.restore_archived_session(session_id)
+            cur.execute("SELECT session_id, created_at FROM sessions WHERE session_id = ?", (session_id,))
+            row = cur.fetchone()
+            return {"session_id": row["session_id"], "created_at": row["created_at"]}
+
+    def add_message(self, session_id: str, role: str, content: str) -> None:
+        with self._connect() as conn:
+            cur = conn.cursor()
+            cur.execute(
+                "INSERT INTO messages (session_id, role, content, created_at) VALUES (?, ?, ?, ?)",
+                (session_id, role, content, iso_now()),
+            )
+            conn.commit()
+
+    def get_messages(self, session_id: str, limit: Optional[int] = None) -> List[Dict[str, str]]:
+        with self._connect() as conn:
+            cur = conn.cursor()
+            if limit is None:
+                cur.execute(
+                    "SELECT role, content FROM messages WHERE session_id = ? ORDER BY id ASC",
+                    (session_id,),
+                )
+                rows = cur.fetchall()
+            else:
+                # Obtenemos últimos N (desc) y luego invertimos para orden ascendente
+                cur.execute(
+                    "SELECT role, content FROM messages WHERE session_id = ? ORDER BY id DESC LIMIT ?",
+                    (session_id, limit),
+                )
+                rows = list(reversed(cur.fetchall()))
+
+        return [{"role": r["role"], "content": r["content"]} for r in rows]
+
+    def get_apolo_state(self, session_id: str) -> Optional[Dict]:
+        with self._connect() as conn:
+            cur = conn.cursor()
+            cur.execute("SELECT state_json FROM apolo_state WHERE session_id = ?", (session_id,))
+            row = cur.fetchone()
+            if not row:
+                return None
+            try:
+                return json.loads(row["state_json"])  # type: ignore
+            except Exception:
+                return None
+
+    def set_apolo_state(self, session_id: str, state: Dict) -> None:
+        payload = json.dumps(state, ensure_ascii=False)
+        with self._connect() as conn:
+            cur = conn.cursor()
+            cur.execute(
+                "INSERT INTO apolo_state (session_id, state_json, updated_at) VALUES (?, ?, ?)\n             ON CONFLICT(session_id) DO UPDATE SET state_json=excluded.state_json, updated_at=excluded.updated_at",
+                (session_id, payload, iso_now()),
+            )
+            conn.commit()
+
+    def delete_apolo_state(self, session_id: str) -> int:
+        with self._connect() as conn:
+            cur = conn.cursor()
+            cur.execute("DELETE FROM apolo_state WHERE session_id = ?", (session_id,))
+            conn.commit()
+            return cur.rowcount
+
+    def reset_session(self, session_id: str) -> Dict[str, int | bool]:
+        with self._connect() as conn:
+            cur = conn.cursor()
+            cur.execute("SELECT COUNT(*) AS cnt FROM messages WHERE session_id = ?", (session_id,))
+            msg_count = int(cur.fetchone()["cnt"])
+
+            cur.execute("DELETE FROM messages WHERE session_id = ?", (session_id,))
+            cur.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+            session_deleted = cur.rowcount
+            cur.execute("DELETE FROM apolo_state WHERE session_id = ?", (session_id,))
+            cur.execute("SELECT message_count FROM archived_sessions WHERE session_id = ?", (session_id,))
+            archived = cur.fetchone()
+            if archived:
+                msg_count += int(archived["message_count"])
+                cur.execute("DELETE FROM archived_sessions WHERE session_id = ?", (session_id,))
+            conn.commit()
+
+        return {"had_conversation": msg_count > 0, "messages_deleted": msg_count, "session_deleted": session_deleted}
+
+    # --- Archivado y compactación ---
+
+    _ACTIVITY_SQL = """
+        SELECT s.session_id AS session_id,
+               MAX(
+                   s.created_at,
+                   COALESCE(s.last_seen, ''),
+                   COALESCE((SELECT MAX(m.created_at) FROM messages m WHERE m.session_id = s.session_id), ''),
+                   COALESCE(a.updated_at, '')
+               ) AS last_activity,
+               a.state_json AS state_json
+        FROM sessions s
+        LEFT JOIN apolo_state a ON a.session_id = s.session_id
+    """
+
+    def list_session_activity(self) -> List[Dict]:
+        with self._connect() as conn:
+            cur = conn.cursor()
+            cur.execute(self._ACTIVITY_SQL)
+            rows = cur.fetchall()
+
+        return [
+            {"session_id": r["session_id"], "last_activity": r["last_activity"], "state": parse_state(r["state_json"])}
+            for r in rows
+        ]
+
+    def _last_activity(self, cur: sqlite3.Cursor, session_id: str) -> Optional[str]:
+        cur.execute(self._ACTIVITY_SQL + " WHERE s.session_id = ?", (session_id,))
+        row = cur.fetchone()
+        return row["last_activity"] if row else None
+
+    def _export_session(self, cur: sqlite3.Cursor, session_id: str) -> Optional[Dict]:
+        cur.execute("SELECT session_id, created_at FROM sessions WHERE session_id = ?", (session_id,))
+        session = cur.fetchone()
+        if not session:
+            return None
+        cur.execute(
+            "SELECT role, content, created_at FROM messages WHERE session_id = ? ORDER BY id ASC",
+            (session_id,),
+        )
+        messages = [{"role": r["role"], "content": r["content"], "created_at": r["created_at"]} for r in cur.fetchall()]
+        cur.execute("SELECT state_json, updated_at FROM apolo_state WHERE session_id = ?", (session_id,))
+        state_row = cur.fetchone()
+        return {
+            "session_id": session["session_id"],
+            "created_at": session["created_at"],
+            "messages": messages,
+            "apolo_state": state_row["state_json"] if state_row else None,
+            "apolo_state_updated_at": state_row["updated_at"] if state_row else None,
+        }
+
+    def _import_session(self, cur: sqlite3.Cursor, document: Dict) -> None:
+        """Escribe el documento conservando lo que ya hubiera en las tablas vivas.
+
+        Mensajes escritos mientras la sesión estaba archivada (un request en curso
+        al archivar) se reubican después del historial del documento, y el estado
+        Apolo más reciente (por `updated_at`) gana.
+        """
+        session_id = document["session_id"]
+        cur.execute(
+            "INSERT INTO sessions (session_id, created_at) VALUES (?, ?)\n             ON CONFLICT(session_id) DO UPDATE SET created_at=excluded.created_at",
+            (session_id, document["created_at"]),
+        )
+        cur.execute(
+            "SELECT role, content, created_at FROM messages WHERE session_id = ? ORDER BY id ASC",
+            (session_id,),
+        )
+        newer = [{"role": r["role"], "content": r["content"], "created_at": r["created_at"]} for r in cur.fetchall()]
+        cur.execute("DELETE FROM messages WHERE session_id = ?", (session_id,))
+        cur.executemany(
+            "INSERT INTO messages (session_id, role, content, created_at) VALUES (?, ?, ?, ?)",
+            [(session_id, m["role"], m["content"], m["created_at"]) for m in document["messages"] + newer],
+        )
+        if document.get("apolo_state") is not None:
+            cur.execute(
+                "INSERT INTO apolo_state (session_id, state_json, updated_at) VALUES (?, ?, ?)\n             ON CONFLICT(session_id) DO UPDATE SET state_json=excluded.state_json, updated_at=excluded.updated_at\n             WHERE excluded.updated_at > apolo_state.updated_at",
+                (session_id, document["apolo_state"], document["apolo_state_updated_at"]),
+            )
+
+    def _delete_live(self, cur: sqlite3.Cursor, session_id: str) -> None:
+        cur.execute("DELETE FROM messages WHERE session_id = ?", (session_id,))
+        cur.execute("DELETE FROM apolo_state WHERE session_id = ?", (session_id,))
+        cur.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+
+    def archive_session(
+        self, session_id: str, reason: str, codec: str = "zlib", cutoff: Optional[str] = None
+    ) -> Optional[Dict[str, int]]:
+        with self._connect() as conn:
+            cur = conn.cursor()
+            # Bloqueo de escritura desde el inicio: evita perder mensajes concurrentes
+            cur.execute("BEGIN IMMEDIATE")
+            last_activity = self._last_activity(cur, session_id)
+            # Re-chequeo bajo lock: la sesión pudo recibir mensajes después del escaneo
+            if last_activity is None or (cutoff is not None and last_activity > cutoff):
+                conn.rollback()
+                return None
+            document = self._export_session(cur, session_id)
+            record = build_archive_record(document, reason, codec)
+            self._insert_archived(cur, record)
+            self._delete_live(cur, session_id)
+            conn.commit()
+
+        return {
+            "messages": record["message_count"],
+            "raw_bytes": record["raw_bytes"],
+            "compressed_bytes": len(record["payload"]),
+        }
+
+    def _insert_archived(self, cur: sqlite3.Cursor, record: Dict) -> None:
+        cur.execute(
+            f"INSERT OR REPLACE INTO archived_sessions ({_ARCHIVE_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (
+                record["session_id"],
+                record["reason"],
+                record["codec"],
+                record["payload"],
+                record["message_count"],
+                record["raw_bytes"],
+                record["archived_at"],
+            ),
+        )
+
+    def get_archived_session(self, session_id: str) -> Optional[Dict]:
+        with self._connect() as conn:
+            cur = conn.cursor()
+            cur.execute(f"SELECT {_ARCHIVE_COLUMNS} FROM archived_sessions WHERE session_id = ?", (session_id,))
+            row = cur.fetchone()
+        if not row:
+            return None
+        return load_archive_record(dict(row))
+
+    def restore_archived_session(self, session_id: str) -> bool:
+        with self._connect() as conn:
+            cur = conn.cursor()
+            # Lectura y borrado del archivo en la misma transacción: dos procesos
+            # que restauran a la vez no duplican mensajes.
+            cur.execute("BEGIN IMMEDIATE")
+            cur.execute(f"SELECT {_ARCHIVE_COLUMNS} FROM archived_sessions WHERE session_id = ?", (session_id,))
+            row = cur.fetchone()
+            if not row:
+                conn.rollback()
+                return False
+            self._import_session(cur, load_archive_record(dict(row)))
+            cur.execute("DELETE FROM archived_sessions WHERE session_id = ?", (session_id,))
+            conn.commit()
+        return True
+
+    def storage_stats(self) -> Dict[str, int]:
+        wal_path = self.db_path + "-wal"
+        with self._connect() as conn:
+            cur = conn.cursor()
+            page_size = int(cur.execute("PRAGMA page_size").fetchone()[0])
+            page_count = int(cur.execute("PRAGMA page_count").fetchone()[0])
+            freelist_count = int(cur.execute("PRAGMA freelist_count").fetchone()[0])
+            sessions = int(cur.execute("SELECT COUNT(*) FROM sessions").fetchone()[0])
+            messages = int(cur.execute("SELECT COUNT(*) FROM messages").fetchone()[0])
+            archived = int(cur.execute("SELECT COUNT(*) FROM archived_sessions").fetchone()[0])
+        return {
+            "db_bytes": os.path.getsize(self.db_path) if os.path.exists(self.db_path) else 0,
+            "wal_bytes": os.path.getsize(wal_path) if os.path.exists(wal_path) else 0,
+            "page_size": page_size,
+            "page_count": page_count,
+            "freelist_pages": freelist_count,
+            "live_sessions": sessions,
+            "live_messages": messages,
+            "archived_sessions": archived,
+        }
+
+    def compact_storage(self, vacuum_pages: int = 1000, checkpoint: str = "PASSIVE", full_vacuum: bool = False) -> Dict[str, int]:
+        checkpoint = checkpoint.upper()
+        if checkpoint not in {"PASSIVE", "FULL", "RESTART", "TRUNCATE"}:
+            raise ValueError(f"Modo de checkpoint no soportado: {checkpoint}")
+
+        with self._connect() as conn:
+            cur = conn.cursor()
+            freed_before = int(cur.execute("PRAGMA freelist_count").fetchone()[0])
+            if full_vacuum:
+                cur.execute("PRAGMA auto_vacuum=INCREMENTAL")
+                conn.isolation_level = None
+                cur.execute("VACUUM")
+                conn.isolation_level = ""
+            elif int(cur.execute("PRAGMA auto_vacuum").fetchone()[0]) == 2:
+                # executescript avanza el PRAGMA hasta el final (execute sólo libera una página)
+                conn.executescript(f"PRAGMA incremental_vacuum({max(int(vacuum_pages), 0)});")
+            freed_after = int(cur.execute("PRAGMA freelist_count").fetchone()[0])
+            busy, wal_pages, checkpointed = cur.execute(f"PRAGMA wal_checkpoint({checkpoint})").fetchone()
+
+        return {
+            "pages_released": max(freed_before - freed_after, 0),
+            "wal_busy": int(busy),
+            "wal_pages": int(wal_pages),
+            "wal_checkpointed": int(checkpointed),
+        }
+
+    # --- Migración entre backends ---
+
+    def iter_session_ids(self) -> Iterator[str]:
+        with self._connect() as conn:
+            rows = conn.execute("SELECT session_id FROM sessions ORDER BY session_id").fetchall()
+        for r in rows:
+            yield r["session_id"]
+
+    def export_session(self, session_id: str) -> Optional[Dict]:
+        with self._connect() as conn:
+            return self._export_session(conn.cursor(), session_id)
+
+    def import_session(self, document: Dict) -> None:
+        with self._connect() as conn:
+            cur = conn.cursor()
+            cur.execute("BEGIN IMMEDIATE")
+            self._delete_live(cur, document["session_id"])
+            self._import_session(cur, document)
+            conn.commit()
+
+    def iter_archived_records(self) -> Iterator[Dict]:
+        with self._connect() as conn:
+            ids = [r["session_id"] for r in conn.execute("SELECT session_id FROM archived_sessions ORDER BY session_id")]
+        # Un blob por consulta: no cargamos todo el archivo en memoria
+        for session_id in ids:
+            with self._connect() as conn:
+                row = conn.execute(
+                    f"SELECT {_ARCHIVE_COLUMNS} FROM archived_sessions WHERE session_id = ?", (session_id,)
+                ).fetchone()
+            if row:
+                yield dict(row)
+
+    def import_archived_record(self, record: Dict) -> None:
+        with self._connect() as conn:
+            self._insert_archived(conn.cursor(), record)
+            conn.commit()
+
+    def move_session(self, session_id: str, sink: Callable[[Dict], None]) -> Optional[Dict]:
+        with self._connect() as conn:
+            cur = conn.cursor()
+            # El lock se mantiene mientras `sink` escribe en el destino: ningún
+            # mensaje puede llegar entre la exportación y el borrado.
+            cur.execute("BEGIN IMMEDIATE")
+            document = self._export_session(cur, session_id)
+            if document is None:
+                conn.rollback()
+                return None
+            sink(document)
+            self._delete_live(cur, session_id)
+            conn.commit()
+        return document
+
+    def move_archived_record(self, session_id: str, sink: Callable[[Dict], None]) -> Optional[Dict]:
+        with self._connect() as conn:
+            cur = conn.cursor()
+            cur.execute("BEGIN IMMEDIATE")
+            cur.execute(f"SELECT {_ARCHIVE_COLUMNS} FROM archived_sessions WHERE session_id = ?", (session_id,))
+            row = cur.fetchone()
+            if not row:
+                conn.rollback()
+                return None
+            record = dict(row)
+            sink(record)
+            cur.execute("DELETE FROM archived_sessions WHERE session_id = ?", (session_id,))
+            conn.commit()
+        return record
+
+
+def shard_for(session_id: str, shards: int) -> int:
+    """Índice de shard estable entre procesos (crc32; `hash()` de Python es aleatorio)."""
+    return zlib.crc32(session_id.encode("utf-8")) % shards
+
+
+def shard_paths(base_path: str, shards: int) -> List[str]:
+    """Rutas de los shards derivadas de `base_path`.
+
+    `data/chat.sqlite3` con 4 shards → `data/chat.shard00-of-04.sqlite3`, ...
+    El total forma parte del nombre: cambiar N nunca reutiliza archivos con otro ruteo.
+    """
+    root, ext = os.path.splitext(base_path)
+    return [f"{root}.shard{i:02d}-of-{shards:02d}{ext}" for i in range(shards)]
+
+
+class ShardedChatStore(ChatStore):
+    """N archivos SQLite; cada sesión vive entera en el shard `crc32(session_id) % N`.
+
+    Cada shard tiene su propio lock de escritura, así que procesos que escriben
+    sesiones distintas dejan de serializarse entre sí.
+    """
+
+    def __init__(self, base_path: str, shards: int):
+        if shards < 1:
+            raise ValueError("El número de shards debe ser >= 1")
+        self.base_path = base_path
+        self.shards = [SQLiteChatStore(p) for p in shard_paths(base_path, shards)]
+
+    def _shard(self, session_id: str) -> SQLiteChatStore:
+        return self.shards[shard_for(session_id, len(self.shards))]
+
+    def init_db(self) -> None:
+        for shard in self.shards:
+            shard.init_db()
+
+    def ensure_session(self, session_id: str) -> Dict[str, str]:
+        return self._shard(session_id).ensure_session(session_id)
+
+    def add_message(self, session_id: str, role: str, content: str) -> None:
+        self._shard(session_id).add_message(session_id, role, content)
+
+    def get_messages(self, session_id: str, limit: Optional[int] = None) -> List[Dict[str, str]]:
+        return self._shard(session_id).get_messages(session_id, limit=limit)
+
+    def get_apolo_state(self, session_id: str) -> Optional[Dict]:
+        return self._shard(session_id).get_apolo_state(session_id)
+
+    def set_apolo_state(self, session_id: str, state: Dict) -> None:
+        self._shard(session_id).set_apolo_state(session_id, state)
+
+    def delete_apolo_state(self, session_id: str) -> int:
+        return self._shard(session_id).delete_apolo_state(session_id)
+
+    def reset_session(self, session_id: str) -> Dict[str, int | bool]:
+        return self._shard(session_id).reset_session(session_id)
+
+    def list_session_activity(self) -> List[Dict]:
+        result: List[Dict] = []
+        for shard in self.shards:
+            result.extend(shard.list_session_activity())
+        return result
+
+    def archive_session(
+        self, session_id: str, reason: str, codec: str = "zlib", cutoff: Optional[str] = None
+    ) -> Optional[Dict[str, int]]:
+        return self._shard(session_id).archive_session(session_id, reason=reason, codec=codec, cutoff=cutoff)
+
+    def get_archived_session(self, session_id: str) -> Optional[Dict]:
+        return self._shard(session_id).get_archived_session(session_id)
+
+    def restore_archived_session(self, session_id: str) -> bool:
+        return self._shard(session_id).restore_archived_session(session_id)
+
+    def storage_stats(self) -> Dict[str, int]:
+        """Suma de los contadores de todos los shards (`page_size` es el del primero)."""
+        total: Dict[str, int] = {}
+        for shard in self.shards:
+            for k, v in shard.storage_stats().items():
+                if k == "page_size":
+                    total.setdefault(k, v)
+                else:
+                    total[k] = total.get(k, 0) + v
+        total["shards"] = len(self.shards)
+        return total
+
+    def compact_storage(self, vacuum_pages: int = 1000, checkpoint: str = "PASSIVE", full_vacuum: bool = False) -> Dict[str, int]:
+        total: Dict[str, int] = {}
+        for shard in self.shards:
+            for k, v in shard.compact_storage(vacuum_pages, checkpoint, full_vacuum).items():
+                total[k] = total.get(k, 0) + v
+        return total
+
+    def iter_session_ids(self) -> Iterator[str]:
+        for shard in self.shards:
+            yield from shard.iter_session_ids()
+
+    def export_session(self, session_id: str) -> Optional[Dict]:
+        return self._shard(session_id).export_session(session_id)
+
+    def import_session(self, document: Dict) -> None:
+        self._shard(document["session_id"]).import_session(document)
+
+    def iter_archived_records(self) -> Iterator[Dict]:
+        for shard in self.shards:
+            yield from shard.iter_archived_records()
+
+    def import_archived_record(self, record: Dict) -> None:
+        self._shard(record["session_id"]).import_archived_record(record)
+
+    def move_session(self, session_id: str, sink: Callable[[Dict], None]) -> Optional[Dict]:
+        return self._shard(session_id).move_session(session_id, sink)
+
+    def move_archived_record(self, session_id: str, sink: Callable[[Dict], None]) -> Optional[Dict]:
+        return self._shard(session_id).move_archived_record(session_id, sink)
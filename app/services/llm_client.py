@@ -13,7 +13,7 @@ except Exception:  # pragma: no cover
 
 
 class LLMClient:
-    """Cliente unificado para LLMs (OpenAI y Groq).
+    """Cliente unificado para LLMs (OpenAI y Groq; "stub" local para pruebas sin red).
 
     Uso:
         client = LLMClient(provider="openai")
@@ -25,7 +25,7 @@ class LLMClient:
 
     def __init__(self, provider: str, model: Optional[str] = None, api_key: Optional[str] = None):
         self.provider = provider.lower().strip()
-        if self.provider not in {"openai", "groq"}:
+        if self.provider not in {"openai", "groq", "stub"}:
             raise ValueError(f"Proveedor no soportado: {provider}")
 
         if self.provider == "openai":
@@ -46,6 +46,11 @@ class LLMClient:
             self.client = Groq(api_key=api_key)
             self.default_model = model or os.getenv("GROQ_MODEL", "llama-3.1-8b-instant")
 
+        elif self.provider == "stub":
+            from app.services.llm_stub import StubLLM
+            self.client = StubLLM()
+            self.default_model = model or "stub"
+
     def chat(
         self,
         messages: List[Dict[str, str]],
@@ -87,7 +92,7 @@ class LLMClient:
                         yield delta.content
                 except Exception:
                     continue
-        elif self.provider == "groq":
+        elif self.provider in {"groq", "stub"}:
             resp = self.client.chat.completions.create(
                 model=mdl,
                 messages=messages,
@@ -0,0 +1,93 @@
+"""LLM local determinista para pruebas de carga y replay sin red.
+
+Imita la forma mínima del SDK (`client.chat.completions.create(...)`) que usa
+`LLMClient`, así que se activa sólo con `LLM_PROVIDER=stub`. Respuestas:
+  - extract: llena el próximo slot vacío con el último mensaje del usuario.
+  - next: confirmación breve (la pregunta la pone la plantilla del slot).
+  - guard: devuelve el mensaje original sin cambios.
+  - final/summary: resumen plano del estado.
+`LLM_STUB_LATENCY_MS` simula el tiempo de respuesta de un proveedor real.
+"""
+import json
+import os
+import time
+from types import SimpleNamespace
+from typing import Dict, Iterator, List, Optional
+
+_STATE_PREFIX = "Estado actual (JSON): "
+_FINAL_PREFIX = "Estado final (JSON): "
+_GUARD_MARKER = "Mensaje original:\n"
+
+
+def _last_user_text(messages: List[Dict[str, str]]) -> str:
+    for m in reversed(messages):
+        content = m.get("content") or ""
+        if m.get("role") == "user" and not content.startswith(
+            (_STATE_PREFIX, _FINAL_PREFIX, "Próximo slot vacío canónico:")
+        ):
+            return content
+    return ""
+
+
+def _find_prefixed(messages: List[Dict[str, str]], prefix: str) -> Optional[str]:
+    for m in reversed(messages):
+        content = m.get("content") or ""
+        if content.startswith(prefix):
+            return content[len(prefix):]
+    return None
+
+
+def stub_reply(messages: List[Dict[str, str]]) -> str:
+    """Respuesta determinista según el tipo de llamada del orquestador."""
+    from app.services.apolo_orchestrator import DEFAULT_SLOTS
+
+    last = (messages[-1].get("content") or "") if messages else ""
+    if last.startswith("Paso:") and _GUARD_MARKER in last:
+        return last.split(_GUARD_MARKER, 1)[1]
+
+    final_state = _find_prefixed(messages, _FINAL_PREFIX)
+    if final_state is not None:
+        try:
+            state = json.loads(final_state)
+        except Exception:
+            state = {}
+        lines = [f"- {k}: {state.get(k)}" for k in DEFAULT_SLOTS]
+        return "Resumen del proyecto:\n" + "\n".join(lines)
+
+    raw_state = _find_prefixed(messages, _STATE_PREFIX)
+    if raw_state is None:
+        return "Respuesta de prueba."
+    try:
+        state = json.loads(raw_state)
+    except Exception:
+        state = {}
+    missing = [k for k in DEFAULT_SLOTS if state.get(k) in (None, "")]
+    user_text = _last_user_text(messages)
+    updates = {missing[0]: user_text[:200]} if missing and user_text else {}
+    # Sirve tanto a extract (updates) como a next (confirmacion_breve)
+    return json.dumps(
+        {"updates": updates, "confirmacion_breve": "Entendido.", "slot_actual": None, "pregunta": None},
+        ensure_ascii=False,
+    )
+
+
+class _Completions:
+    def create(self, model: str, messages: List[Dict[str, str]], stream: bool = False, **kwargs):
+        latency_ms = float(os.getenv("LLM_STUB_LATENCY_MS", "0"))
+        if latency_ms > 0:
+            time.sleep(latency_ms / 1000)
+        text = stub_reply(messages)
+        if stream:
+            return self._stream(text)
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=text))])
+
+    def _stream(self, text: str) -> Iterator[SimpleNamespace]:
+        for i in range(0, len(text), 16):
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=text[i : i + 16]))])
+
+
+class StubLLM:
+    """Cliente con la misma interfaz que `OpenAI`/`Groq` para `chat.completions`."""
+
+    def __init__(self):
+        self.chat = SimpleNamespace(completions=_Completions())
@@ -0,0 +1,136 @@
+"""Grabación opcional de tráfico de `chat_bp` en JSONL para reproducirlo luego.
+
+Se activa definiendo `CHAT_RECORD_PATH` (p.ej. `./data/requests.jsonl`). Cada
+línea es un par request/response sanitizado con tiempos por etapa:
+
+    {"ts": "...", "t": 1700000000.12, "method": "POST", "path": "/chat/stream",
+     "session": "<sha256 corto>", "request": {...}, "status": 200,
+     "response": {...}, "duration_ms": 812.4, "stages": {"llm.extract": 301.2, ...}}
+
+Sanitizado: `sessionId` se reemplaza por un hash estable (también dentro de
+cualquier texto del request/response, p.ej. el mensaje de `/chat/reset`), correos y secuencias
+largas de dígitos se enmascaran y los textos se recortan a `CHAT_RECORD_MAX_CHARS`.
+No se guardan headers ni IP.
+"""
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, Optional
+
+from flask import Response, g, has_request_context, request
+
+_WRITE_LOCK = threading.Lock()
+
+_EMAIL_RE = re.compile(r"[\w.+-]+@[\w-]+(\.[\w-]+)+")
+_DIGITS_RE = re.compile(r"\+?\d[\d\s().-]{6,}\d")
+_SESSION_KEYS = ("sessionId", "session_id")
+_SESSION_PLACEHOLDER = "\ue000session\ue000"
+
+
+def record_path() -> Optional[str]:
+    """Ruta del JSONL de grabación, o None si la grabación está desactivada."""
+    return os.getenv("CHAT_RECORD_PATH") or None
+
+
+def hash_session(session_id: str) -> str:
+    return hashlib.sha256(session_id.encode("utf-8")).hexdigest()[:16]
+
+
+def sanitize_text(text: str, max_chars: Optional[int] = None, session_id: Optional[str] = None) -> str:
+    if max_chars is None:
+        max_chars = int(os.getenv("CHAT_RECORD_MAX_CHARS", "4000"))
+    if session_id:
+        # El id pasa por un marcador sin dígitos: ni el id ni su hash (hex) deben
+        # tocarse con las máscaras, o el hash dejaría de coincidir con `session`
+        text = re.sub(rf"(?<!\w){re.escape(session_id)}(?!\w)", _SESSION_PLACEHOLDER, text)
+    text = _EMAIL_RE.sub("<email>", text)
+    text = _DIGITS_RE.sub("<num>", text)
+    if session_id:
+        text = text.replace(_SESSION_PLACEHOLDER, hash_session(session_id))
+    return text[:max_chars]
+
+
+def sanitize_payload(value: Any, session_id: Optional[str] = None) -> Any:
+    """Sanitiza recursivamente un JSON (dict/list/str); los ids de sesión se hashean.
+
+    Con `session_id`, sus apariciones dentro de cualquier texto también se hashean.
+    """
+    if isinstance(value, dict):
+        return {
+            k: hash_session(str(v)) if k in _SESSION_KEYS and v else sanitize_payload(v, session_id)
+            for k, v in value.items()
+        }
+    if isinstance(value, list):
+        return [sanitize_payload(v, session_id) for v in value]
+    if isinstance(value, str):
+        return sanitize_text(value, session_id=session_id)
+    return value
+
+
+@contextmanager
+def timed_stage(name: str) -> Iterator[None]:
+    """Acumula la duración de una etapa (ms) en la grabación del request actual.
+
+    Fuera de un request grabado no hace nada, así que puede envolver cualquier
+    código del flujo de `/chat/stream` sin coste apreciable.
+    """
+    stages = g.get("traffic_stages") if has_request_context() else None
+    if stages is None:
+        yield
+        return
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        stages[name] = round(stages.get(name, 0.0) + (time.perf_counter() - t0) * 1000, 3)
+
+
+def start_recording() -> None:
+    """`before_request` de chat_bp: marca el inicio si la grabación está activa."""
+    if record_path() is None:
+        return
+    g.traffic_started = time.time()
+    g.traffic_t0 = time.perf_counter()
+    g.traffic_stages = {}
+
+
+def finish_recording(response: Response) -> Response:
+    """`after_request` de chat_bp: agrega una línea al JSONL de grabación."""
+    path = record_path()
+    if path is None or g.get("traffic_t0") is None:
+        return response
+    try:
+        duration_ms = (time.perf_counter() - g.traffic_t0) * 1000
+        body = request.get_json(silent=True) or {}
+        session_id = next((body.get(k) for k in _SESSION_KEYS if isinstance(body, dict) and body.get(k)), None)
+        session_id = str(session_id) if session_id else None
+        entry: Dict[str, Any] = {
+            "ts": datetime.fromtimestamp(g.traffic_started, timezone.utc).isoformat(),
+            "t": round(g.traffic_started, 6),
+            "method": request.method,
+            "path": request.path,
+            "session": hash_session(session_id) if session_id else None,
+            "request": sanitize_payload(body, session_id),
+            "status": response.status_code,
+            "response": sanitize_payload(response.get_json(silent=True), session_id) if response.is_json else None,
+            "duration_ms": round(duration_ms, 3),
+            "stages": g.traffic_stages,
+        }
+        line = (json.dumps(entry, ensure_ascii=False) + "\n").encode("utf-8")
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        # Un solo write() con O_APPEND: las líneas de varios procesos no se mezclan
+        with _WRITE_LOCK:
+            fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                os.write(fd, line)
+            finally:
+                os.close(fd)
+    except Exception:
+        # La grabación nunca debe romper la respuesta al cliente
+        pass
+    return response
@@ -0,0 +1,287 @@
+"""Replay de tráfico grabado (ver `traffic_recorder`) contra una instancia.
+
+Cada sesión grabada se reproduce en orden y respetando los tiempos entre
+llegadas originales (divididos por `--speed`). `--scale N` lanza N copias de
+cada sesión con ids distintos para multiplicar la carga. El reporte incluye la
+distribución de latencias y la tasa de error por ruta, y la comparación con
+las latencias/etapas grabadas.
+
+Totalmente offline, contra la app en el mismo proceso y el LLM stub:
+    LLM_PROVIDER=stub CHAT_DB_PATH=/tmp/replay.sqlite3 \\
+        python -m app.services.traffic_replay data/requests.jsonl --target inproc --speed 10 --scale 4
+
+Contra un servidor (p.ej. arrancado con LLM_PROVIDER=stub):
+    python -m app.services.traffic_replay data/requests.jsonl --target http://localhost:5000
+"""
+import argparse
+import json
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+from collections import defaultdict
+from typing import Callable, Dict, List, Optional, Tuple
+
+_SESSION_KEYS = ("sessionId", "session_id")
+
+# (method, path, body) -> status
+Sender = Callable[[str, str, Optional[Dict]], int]
+
+
+def load_recording(path: str) -> Tuple[Dict[str, List[Dict]], float]:
+    """Agrupa las entradas del JSONL por sesión, ordenadas por tiempo.
+
+    Retorna (sesiones, t0) donde t0 es el instante de la primera entrada.
+    Las entradas sin sesión (p.ej. GET /chat/) forman cada una su propia "sesión".
+    """
+    sessions: Dict[str, List[Dict]] = defaultdict(list)
+    with open(path, "r", encoding="utf-8") as f:
+        for n, line in enumerate(f):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                entry = json.loads(line)
+            except Exception:
+                continue
+            if "t" not in entry or "path" not in entry:
+                continue
+            sessions[entry.get("session") or f"_anon{n}"].append(entry)
+    for entries in sessions.values():
+        entries.sort(key=lambda e: e["t"])
+    t0 = min((e[0]["t"] for e in sessions.values()), default=0.0)
+    return dict(sessions), t0
+
+
+def _percentiles(values: List[float]) -> Dict[str, float]:
+    if not values:
+        return {"count": 0}
+    values = sorted(values)
+
+    def _pct(p: float) -> float:
+        return round(values[min(int(p * len(values)), len(values) - 1)], 3)
+
+    return {
+        "count": len(values),
+        "mean": round(sum(values) / len(values), 3),
+        "p50": _pct(0.50),
+        "p90": _pct(0.90),
+        "p95": _pct(0.95),
+        "p99": _pct(0.99),
+        "max": round(values[-1], 3),
+    }
+
+
+def http_sender(base_url: str, timeout: float = 120.0) -> Sender:
+    base_url = base_url.rstrip("/")
+
+    def send(method: str, path: str, body: Optional[Dict]) -> int:
+        data = json.dumps(body).encode("utf-8") if body is not None and method != "GET" else None
+        req = urllib.request.Request(
+            base_url + path,
+            data=data,
+            method=method,
+            headers={"Content-Type": "application/json"},
+        )
+        try:
+            with urllib.request.urlopen(req, timeout=timeout) as resp:
+                resp.read()
+                return resp.status
+        except urllib.error.HTTPError as e:
+            return e.code
+
+    return send
+
+
+def inproc_sender() -> Sender:
+    """Envía a la app Flask en el mismo proceso (sin red). Un cliente por hilo."""
+    from app import create_app
+
+    app = create_app()
+    local = threading.local()
+
+    def send(method: str, path: str, body: Optional[Dict]) -> int:
+        client = getattr(local, "client", None)
+        if client is None:
+            client = local.client = app.test_client()
+        resp = client.open(path, method=method, json=body if method != "GET" else None)
+        return resp.status_code
+
+    return send
+
+
+def _replay_session(
+    send: Sender,
+    entries: List[Dict],
+    session_id: str,
+    t0: float,
+    start: float,
+    speed: float,
+    results: List[Dict],
+    lock: threading.Lock,
+) -> None:
+    for entry in entries:
+        scheduled = start + (entry["t"] - t0) / speed
+        delay = scheduled - time.time()
+        if delay > 0:
+            time.sleep(delay)
+        body = entry.get("request")
+        if isinstance(body, dict):
+            body = {k: session_id if k in _SESSION_KEYS else v for k, v in body.items()}
+        sent = time.time()
+        t = time.perf_counter()
+        error = None
+        try:
+            status = send(entry.get("method", "POST"), entry["path"], body)
+        except Exception as e:
+            status, error = 0, type(e).__name__
+        latency_ms = (time.perf_counter() - t) * 1000
+        with lock:
+            results.append({
+                "path": entry["path"],
+                "status": status,
+                "error": error,
+                "latency_ms": latency_ms,
+                "lag_ms": max(sent - scheduled, 0.0) * 1000,
+            })
+
+
+def peak_active_sessions(jobs: List[Tuple[List[Dict], str]], t0: float, speed: float) -> int:
+    """Máximo de sesiones simultáneamente activas según los tiempos grabados.
+
+    Una sesión está activa desde su primera llegada hasta el fin de su última
+    respuesta grabada (`t` + `duration_ms`), con los tiempos divididos por `speed`.
+    """
+    events: List[Tuple[float, int]] = []
+    for entries, _ in jobs:
+        last = entries[-1]
+        events.append(((entries[0]["t"] - t0) / speed, 1))
+        events.append(((last["t"] + last.get("duration_ms", 0.0) / 1000 - t0) / speed, -1))
+    # Ante empate, los fines antes que los inicios
+    events.sort()
+    active = peak = 0
+    for _, delta in events:
+        active += delta
+        peak = max(peak, active)
+    return peak
+
+
+def replay(
+    send: Sender,
+    sessions: Dict[str, List[Dict]],
+    t0: float,
+    speed: float = 1.0,
+    scale: int = 1,
+    max_concurrency: int = 256,
+) -> Dict:
+    """Reproduce todas las sesiones (× `scale`) y retorna el reporte.
+
+    Cada sesión arranca en su propio hilo a la hora de su primera llegada; no
+    hay cola detrás de otras sesiones. Si el pico de sesiones simultáneas
+    supera `max_concurrency`, falla antes de enviar nada con ValueError.
+    """
+    if speed <= 0:
+        raise ValueError("speed debe ser > 0")
+    run_id = uuid.uuid4().hex[:8]
+    jobs = sorted(
+        (
+            (entries, f"replay-{run_id}-{copy}-{key}")
+            for copy in range(max(scale, 1))
+            for key, entries in sessions.items()
+        ),
+        key=lambda job: job[0][0]["t"],
+    )
+    peak = peak_active_sessions(jobs, t0, speed)
+    if peak > max_concurrency:
+        raise ValueError(
+            f"El replay necesita {peak} sesiones simultáneas y max_concurrency es {max_concurrency}; "
+            "sube --max-concurrency o baja --scale/--speed"
+        )
+
+    results: List[Dict] = []
+    lock = threading.Lock()
+    threads: List[threading.Thread] = []
+    start = time.time()
+    for entries, session_id in jobs:
+        delay = start + (entries[0]["t"] - t0) / speed - time.time()
+        if delay > 0:
+            time.sleep(delay)
+        thread = threading.Thread(
+            target=_replay_session,
+            args=(send, entries, session_id, t0, start, speed, results, lock),
+            daemon=True,
+        )
+        thread.start()
+        threads.append(thread)
+    for thread in threads:
+        thread.join()
+    elapsed = time.time() - start
+    return build_report(results, sessions, elapsed, speed=speed, scale=scale)
+
+
+def build_report(results: List[Dict], sessions: Dict[str, List[Dict]], elapsed: float, speed: float, scale: int) -> Dict:
+    by_path: Dict[str, List[Dict]] = defaultdict(list)
+    for r in results:
+        by_path[r["path"]].append(r)
+
+    def _summary(rows: List[Dict]) -> Dict:
+        errors = [r for r in rows if r["error"] or r["status"] >= 400]
+        statuses: Dict[str, int] = defaultdict(int)
+        for r in rows:
+            statuses[str(r["status"]) if not r["error"] else r["error"]] += 1
+        return {
+            "requests": len(rows),
+            "errors": len(errors),
+            "error_rate": round(len(errors) / len(rows), 4) if rows else 0.0,
+            "statuses": dict(statuses),
+            "latency_ms": _percentiles([r["latency_ms"] for r in rows]),
+        }
+
+    recorded = [e for entries in sessions.values() for e in entries]
+    stages: Dict[str, List[float]] = defaultdict(list)
+    for e in recorded:
+        for name, ms in (e.get("stages") or {}).items():
+            stages[name].append(ms)
+
+    return {
+        "speed": speed,
+        "scale": scale,
+        "sessions": len(sessions) * max(scale, 1),
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(len(results) / elapsed, 2) if elapsed > 0 else 0.0,
+        "schedule_lag_ms": _percentiles([r["lag_ms"] for r in results]),
+        "overall": _summary(results),
+        "by_path": {p: _summary(rows) for p, rows in sorted(by_path.items())},
+        "recorded": {
+            "requests": len(recorded),
+            "latency_ms": _percentiles([e["duration_ms"] for e in recorded if "duration_ms" in e]),
+            "stages_ms": {name: _percentiles(v) for name, v in sorted(stages.items())},
+        },
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Replay de tráfico grabado de /chat")
+    parser.add_argument("recording", help="JSONL generado con CHAT_RECORD_PATH")
+    parser.add_argument("--target", default="inproc", help="URL base (http://host:puerto) o 'inproc'")
+    parser.add_argument("--speed", type=float, default=1.0, help="Factor de compresión de los tiempos entre llegadas")
+    parser.add_argument("--scale", type=int, default=1, help="Copias de cada sesión (multiplica la carga)")
+    parser.add_argument("--max-concurrency", type=int, default=256, help="Máximo de sesiones simultáneas (falla antes de empezar si se supera)")
+    parser.add_argument("--timeout", type=float, default=120.0, help="Timeout por request HTTP (s)")
+    args = parser.parse_args(argv)
+
+    sessions, t0 = load_recording(args.recording)
+    if not sessions:
+        parser.error(f"Sin entradas reproducibles en {args.recording}")
+    send = inproc_sender() if args.target == "inproc" else http_sender(args.target, timeout=args.timeout)
+    try:
+        report = replay(send, sessions, t0, speed=args.speed, scale=args.scale, max_concurrency=args.max_concurrency)
+    except ValueError as e:
+        parser.error(str(e))
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,23 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services import chat_store  # noqa: E402
+from app.services.chat_store_memory import MemoryChatStore  # noqa: E402
+from app.services.chat_store_sqlite import SQLiteChatStore  # noqa: E402
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, tmp_path):
+    """Backend vacío registrado como activo en `chat_store` durante el test."""
+    if request.param == "memory":
+        backend = MemoryChatStore()
+    else:
+        backend = SQLiteChatStore(str(tmp_path / "chat.sqlite3"))
+    backend.init_db()
+    chat_store.set_store(backend)
+    yield backend
+    chat_store.set_store(None)
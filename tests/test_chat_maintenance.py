@@ -0,0 +1,138 @@
+import time
+
+import pytest
+
+from app.services.apolo_orchestrator import DEFAULT_SLOTS
+from app.services.chat_maintenance import (
+    measure_query_latency,
+    run_maintenance,
+    sample_session_ids,
+    start_background_maintenance,
+)
+from app.services.chat_store_base import iso_now
+from app.services.chat_store_sqlite import SQLiteChatStore
+
+
+def _seed(store, session_id, state=None, messages=3):
+    store.ensure_session(session_id)
+    for i in range(messages):
+        store.add_message(session_id, "user", f"{session_id} mensaje {i} " * 20)
+    if state is not None:
+        store.set_apolo_state(session_id, state)
+
+
+def test_archives_done_and_idle_sessions(store):
+    _seed(store, "done", {k: "x" for k in DEFAULT_SLOTS})
+    _seed(store, "idle", {"idea_negocio": "x"})
+    time.sleep(0.2)  # TTL de 0.1 s
+
+    result = run_maintenance(ttl_hours=0.1 / 3600, done_grace_minutes=0, batch_size=0)
+
+    assert result["archived_done"] == 1
+    assert result["archived_idle"] == 1
+    assert store.get_archived_session("done")["reason"] == "done"
+    assert store.get_archived_session("idle")["reason"] == "idle"
+    assert store.get_messages("done") == []
+
+
+def test_ttl_disabled_keeps_unfinished_sessions(store):
+    _seed(store, "asking", {"idea_negocio": "x"})
+
+    result = run_maintenance(ttl_hours=0, done_grace_minutes=0, batch_size=0)
+
+    assert result["archived_done"] == 0 and result["archived_idle"] == 0
+    assert len(store.get_messages("asking")) == 3
+
+
+def test_legacy_state_keys_count_as_done(store):
+    state = {k: "x" for k in DEFAULT_SLOTS if k != "usuarios_objetivos"}
+    state["clientes_objetivos"] = "x"
+    _seed(store, "legacy", state)
+
+    result = run_maintenance(ttl_hours=0, done_grace_minutes=0, batch_size=0)
+
+    assert result["archived_done"] == 1
+
+
+def test_archive_skips_session_active_after_cutoff(store):
+    _seed(store, "busy")
+    cutoff = iso_now()
+    time.sleep(0.01)
+    store.add_message("busy", "user", "llegó después del escaneo")
+
+    assert store.archive_session("busy", reason="idle", cutoff=cutoff) is None
+    assert store.get_archived_session("busy") is None
+    assert len(store.get_messages("busy")) == 4
+
+
+def test_archive_skips_session_with_request_in_flight(store):
+    state = {"idea_negocio": "reservas", "presupuesto": "10k"}
+    _seed(store, "vuelo", state, messages=2)
+    cutoff = iso_now()  # escaneo de mantenimiento
+    time.sleep(0.01)
+
+    # Un request empieza (ensure_session) y el mantenimiento intenta archivar
+    # antes de que escriba su primer mensaje
+    store.ensure_session("vuelo")
+    assert store.archive_session("vuelo", reason="idle", cutoff=cutoff) is None
+    store.add_message("vuelo", "user", "sigo aquí")
+
+    assert store.get_apolo_state("vuelo") == state
+    assert len(store.get_messages("vuelo")) == 3
+
+
+def test_restore_keeps_writes_made_while_archived(store):
+    _seed(store, "s", {"v": 1}, messages=2)
+    assert store.archive_session("s", reason="idle") is not None
+
+    # Un request en curso al archivar escribe sin fila de sesión
+    store.add_message("s", "assistant", "respuesta tardía")
+    store.set_apolo_state("s", {"v": 2})
+    store.ensure_session("s")
+
+    assert [m["content"] for m in store.get_messages("s")][-1] == "respuesta tardía"
+    assert store.get_apolo_state("s") == {"v": 2}
+
+
+def test_invalid_codec_fails_before_archiving(store, monkeypatch):
+    _seed(store, "done", {k: "x" for k in DEFAULT_SLOTS})
+
+    with pytest.raises(ValueError):
+        run_maintenance(ttl_hours=0, done_grace_minutes=0, codec="gzip")
+    assert store.get_archived_session("done") is None
+
+    monkeypatch.setenv("CHAT_ARCHIVE_CODEC", "gzip")
+    assert start_background_maintenance(interval_seconds=60) is False
+
+
+def test_latency_sample_is_stable_across_archiving(store):
+    _seed(store, "a")
+    _seed(store, "b")
+    time.sleep(0.2)
+    sample_ids = sample_session_ids(10)
+
+    before = measure_query_latency(sample_ids)
+    run_maintenance(ttl_hours=0.1 / 3600, done_grace_minutes=0, batch_size=0)
+    after = measure_query_latency(sample_ids)
+
+    assert before["samples"] == after["samples"] == 2
+    assert before["live"] == 2 and after["live"] == 0
+
+
+def test_compaction_releases_pages(tmp_path):
+    backend = SQLiteChatStore(str(tmp_path / "chat.sqlite3"))
+    backend.init_db()
+    for i in range(40):
+        _seed(backend, f"s{i}", messages=20)
+    before = backend.storage_stats()
+
+    for i in range(40):
+        backend.archive_session(f"s{i}", reason="idle")
+    compaction = backend.compact_storage(vacuum_pages=0, checkpoint="TRUNCATE")
+    after = backend.storage_stats()
+
+    assert compaction["pages_released"] > 0
+    assert after["freelist_pages"] == 0
+    assert after["wal_bytes"] == 0
+    assert after["page_count"] < before["page_count"]
+    assert after["archived_sessions"] == 40
@@ -0,0 +1,114 @@
+import pytest
+
+from app.services.chat_store_base import ChatStore
+from app.services.chat_store_memory import MemoryChatStore
+from app.services.chat_store_migrate import migrate
+from app.services.chat_store_sqlite import ShardedChatStore, SQLiteChatStore, shard_for, shard_paths
+
+
+def test_archive_then_ensure_session_restores_history_and_state(store):
+    store.ensure_session("s")
+    for i in range(5):
+        store.add_message("s", "user" if i % 2 == 0 else "assistant", f"m{i}")
+    store.set_apolo_state("s", {"idea_negocio": "reservas"})
+
+    info = store.archive_session("s", reason="done")
+    assert info["messages"] == 5
+    assert store.get_messages("s") == []
+    assert store.get_apolo_state("s") is None
+
+    store.ensure_session("s")
+    assert [m["content"] for m in store.get_messages("s")] == [f"m{i}" for i in range(5)]
+    assert [m["role"] for m in store.get_messages("s")][:2] == ["user", "assistant"]
+    assert store.get_apolo_state("s") == {"idea_negocio": "reservas"}
+    assert store.get_archived_session("s") is None
+
+
+def test_reset_session_counts_archived_messages(store):
+    store.ensure_session("s")
+    store.add_message("s", "user", "hola")
+    store.add_message("s", "assistant", "hola, ¿en qué te ayudo?")
+    store.archive_session("s", reason="idle")
+
+    info = store.reset_session("s")
+
+    assert info == {"had_conversation": True, "messages_deleted": 2, "session_deleted": 0}
+    assert store.get_archived_session("s") is None
+
+
+def test_shard_for_is_stable():
+    # crc32 no depende de PYTHONHASHSEED: el mismo id cae en el mismo shard en todo proceso
+    assert shard_for("demo-123", 8) == 1
+    assert shard_for("sesion-42", 8) == 5
+    assert all(0 <= shard_for(f"s{i}", 5) < 5 for i in range(100))
+
+
+def test_shard_paths_include_shard_count():
+    assert shard_paths("/data/chat.sqlite3", 2) == [
+        "/data/chat.shard00-of-02.sqlite3",
+        "/data/chat.shard01-of-02.sqlite3",
+    ]
+
+
+def _seed_source(source):
+    for i in range(6):
+        sid = f"s{i}"
+        source.ensure_session(sid)
+        source.add_message(sid, "user", f"{sid} pregunta")
+        source.add_message(sid, "assistant", f"{sid} respuesta")
+        source.set_apolo_state(sid, {"idea_negocio": sid})
+    source.archive_session("s0", reason="done")
+    source.archive_session("s1", reason="idle")
+
+
+def test_migration_sqlite_to_sharded_round_trips(tmp_path):
+    source = SQLiteChatStore(str(tmp_path / "chat.sqlite3"))
+    source.init_db()
+    _seed_source(source)
+    target = ShardedChatStore(str(tmp_path / "chat.sqlite3"), 3)
+
+    result = migrate(source, target)
+
+    assert result["sessions"] == 4 and result["messages"] == 8 and result["archived_sessions"] == 2
+    for i in range(2, 6):
+        sid = f"s{i}"
+        assert target.get_messages(sid) == source.get_messages(sid)
+        assert target.get_apolo_state(sid) == {"idea_negocio": sid}
+        assert target._shard(sid).get_messages(sid)
+    assert target.get_archived_session("s0")["reason"] == "done"
+    target.ensure_session("s1")
+    assert [m["content"] for m in target.get_messages("s1")] == ["s1 pregunta", "s1 respuesta"]
+    # Copia: el origen queda intacto
+    assert source.storage_stats()["live_sessions"] == 4
+
+
+def test_migration_delete_source_moves_only_copied_sessions(tmp_path):
+    source = MemoryChatStore()
+    _seed_source(source)
+    target = ShardedChatStore(str(tmp_path / "chat.sqlite3"), 2)
+    target_import = target.import_session
+
+    def import_and_race(document):
+        target_import(document)
+        if document["session_id"] == "s2":
+            # Llega una sesión nueva al origen en plena migración: no debe perderse
+            source.ensure_session("late")
+            source.add_message("late", "user", "hola")
+
+    target.import_session = import_and_race
+    migrate(source, target, delete_source=True)
+
+    assert list(source.iter_session_ids()) == ["late"]
+    assert source.get_messages("late") == [{"role": "user", "content": "hola"}]
+    assert target.get_archived_session("s0") is not None
+    assert source.get_archived_session("s0") is None
+    assert len(target.get_messages("s5")) == 2
+
+
+def test_backend_missing_methods_fails_on_creation():
+    class Incomplete(ChatStore):
+        def init_db(self) -> None:
+            return None
+
+    with pytest.raises(TypeError):
+        Incomplete()
@@ -0,0 +1,62 @@
+import json
+
+import pytest
+
+from app import create_app
+from app.services.traffic_recorder import hash_session, sanitize_payload, sanitize_text
+
+
+@pytest.fixture
+def recording(store, tmp_path, monkeypatch):
+    path = tmp_path / "requests.jsonl"
+    monkeypatch.setenv("CHAT_RECORD_PATH", str(path))
+    return path
+
+
+def test_sanitize_text_masks_emails_digits_and_truncates():
+    text = sanitize_text("escríbeme a ana.perez@mail.com o al +51 999 888 777", max_chars=200)
+    assert text == "escríbeme a <email> o al <num>"
+    assert sanitize_text("x" * 50, max_chars=10) == "x" * 10
+
+
+def test_sanitize_payload_hashes_session_id_everywhere():
+    payload = {"sessionId": "user-secret-id", "detail": ["sesión user-secret-id cerrada"]}
+    clean = sanitize_payload(payload, "user-secret-id")
+    assert clean == {
+        "sessionId": hash_session("user-secret-id"),
+        "detail": [f"sesión {hash_session('user-secret-id')} cerrada"],
+    }
+
+
+def test_session_hash_with_digit_run_is_not_masked():
+    # hash_session("user-7") == "092081140b677b45": 9 dígitos seguidos
+    assert hash_session("user-7").startswith("092081140")
+    clean = sanitize_text("sesión user-7 reiniciada, llama al 999 888 777", max_chars=200, session_id="user-7")
+    assert clean == f"sesión {hash_session('user-7')} reiniciada, llama al <num>"
+
+
+@pytest.mark.parametrize("session_id", ["user-secret-id", "user-7"])
+def test_reset_recording_does_not_contain_raw_session_id(recording, session_id):
+    client = create_app().test_client()
+
+    resp = client.post("/chat/reset", json={"sessionId": session_id})
+    assert session_id in resp.get_json()["message"]
+
+    raw = recording.read_text(encoding="utf-8")
+    assert session_id not in raw
+    entry = json.loads(raw.splitlines()[0])
+    assert entry["session"] == hash_session(session_id)
+    assert hash_session(session_id) in entry["response"]["message"]
+    assert entry["path"] == "/chat/reset" and entry["status"] == 200
+
+
+def test_stream_recording_includes_stage_timings(recording, monkeypatch):
+    monkeypatch.setenv("LLM_PROVIDER", "stub")
+    client = create_app().test_client()
+
+    resp = client.post("/chat/stream", json={"sessionId": "abc-1", "message": "Una app de reservas"})
+    assert resp.status_code == 200
+
+    entry = json.loads(recording.read_text(encoding="utf-8").splitlines()[0])
+    assert {"store.history", "apolo", "llm.extract", "llm.next", "llm.guard"} <= set(entry["stages"])
+    assert "abc-1" not in json.dumps(entry)
@@ -0,0 +1,57 @@
+import threading
+import time
+
+import pytest
+
+from app.services.traffic_replay import peak_active_sessions, replay
+
+
+def _entry(t, duration_ms=10.0, path="/chat/stream"):
+    return {"t": t, "duration_ms": duration_ms, "method": "POST", "path": path, "request": {"sessionId": "h"}}
+
+
+def _recording():
+    # Tres sesiones; "b" empieza antes que "a" en el diccionario pero llega después
+    return {
+        "b": [_entry(100.2), _entry(100.3)],
+        "a": [_entry(100.0), _entry(100.1)],
+        "c": [_entry(100.25)],
+    }, 100.0
+
+
+def test_sessions_start_on_their_own_schedule():
+    sessions, t0 = _recording()
+    first_sent = {}
+    lock = threading.Lock()
+    start = time.time()
+
+    def send(method, path, body):
+        with lock:
+            first_sent.setdefault(body["sessionId"].rsplit("-", 1)[1], time.time() - start)
+        return 200
+
+    report = replay(send, sessions, t0, speed=1.0, max_concurrency=3)
+
+    assert report["overall"]["requests"] == 5 and report["overall"]["errors"] == 0
+    assert sorted(first_sent, key=first_sent.get) == ["a", "b", "c"]
+    assert first_sent["b"] == pytest.approx(0.2, abs=0.05)
+    assert first_sent["c"] == pytest.approx(0.25, abs=0.05)
+
+
+def test_scale_multiplies_sessions_and_counts_errors():
+    sessions, t0 = _recording()
+
+    report = replay(lambda m, p, b: 500 if b["sessionId"].endswith("c") else 200, sessions, t0, speed=50, scale=4)
+
+    assert report["sessions"] == 12
+    assert report["overall"]["requests"] == 20
+    assert report["overall"]["error_rate"] == pytest.approx(4 / 20)
+
+
+def test_replay_refuses_more_active_sessions_than_the_cap():
+    sessions, t0 = _recording()
+    jobs = [(entries, key) for key, entries in sessions.items()]
+    assert peak_active_sessions(jobs, t0, speed=1.0) == 2
+
+    with pytest.raises(ValueError):
+        replay(lambda m, p, b: 200, sessions, t0, scale=2, max_concurrency=3)